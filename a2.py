@@ -1,4 +1,8 @@
+import os
+import sys
+
 from a2_support import *
+from levels import load_level
 
 # Write your classes here
 class Tile:
@@ -462,6 +466,41 @@ def convert_maze(game: list[list[str]]) -> tuple[Grid, Entities, Position]:
     return (maze, entities, player_position)
 
 
+def build_maze(
+    rows: list[str],
+    entity_table: list[tuple[int, int, str]]
+) -> tuple[Grid, Entities]:
+    """
+    Builds the maze and entities from a level compiled by levels.load_level.
+
+    Floor and Wall tiles hold no state, so one instance of each is shared by
+    every cell. Goals are filled during play and each get their own instance.
+
+    Parameters:
+    - rows (list[str]): Tile layout, one string of WALL, FLOOR and GOAL per row.
+    - entity_table (list[tuple[int, int, str]]): (row, column, maze character)
+      for every entity in the maze.
+
+    Returns:
+    tuple[Grid, Entities]: The maze and a dictionary mapping positions to entities.
+    """
+    floor = Floor()
+    wall = Wall()
+    maze = [[wall if cell == WALL else floor if cell == FLOOR else Goal()
+             for cell in row] for row in rows]
+
+    potions = {STRENGTH_POTION: StrengthPotion, MOVE_POTION: MovePotion,
+               FANCY_POTION: FancyPotion}
+    entities = {}
+    for row, column, cell in entity_table:
+        if cell in potions:
+            entities[(row, column)] = potions[cell]()
+        else:
+            entities[(row, column)] = Crate(int(cell))
+
+    return (maze, entities)
+
+
 class SokobanModel:
     """
     Represents the model for the Sokoban game, managing game state and logic.
@@ -470,12 +509,13 @@ class SokobanModel:
     def __init__(self, maze_file: str) -> None:
         """
         Initializes the Sokoban model by reading maze configurations from a file.
+        The parsed maze is cached next to the file, see levels.load_level.
 
         Parameters:
         - maze_file (str): Path to the file containing maze configurations.
         """
-        raw_maze, player_stats = read_file(maze_file)
-        maze, entities, player_position = convert_maze(raw_maze)
+        rows, entity_table, player_position, player_stats = load_level(maze_file)
+        maze, entities = build_maze(rows, entity_table)
         self.maze = maze
         self.entities = entities
         self.player_position = player_position
@@ -671,15 +711,24 @@ class Sokoban:
     Facilitates communication between the model and the view and handles user input.
     """
 
-    def __init__(self, maze_file: str) -> None:
+    def __init__(
+        self,
+        maze_file: str,
+        recorder: 'SessionRecorder | None' = None,
+        view: SokobanView | None = None
+    ) -> None:
         """
         Initializes the Sokoban game with given maze file.
 
         Parameters:
         - maze_file (str): The path to the maze file to be loaded.
+        - recorder (SessionRecorder | None): Records the session if given.
+        - view (SokobanView | None): View to display the game with. Defaults
+          to a SokobanView showing the whole maze.
         """
         self.model = SokobanModel(maze_file)
-        self.view = SokobanView()
+        self.view = view if view is not None else SokobanView()
+        self.recorder = recorder
 
     def display(self) -> None:
         """
@@ -715,27 +764,90 @@ class Sokoban:
             
             # Display game state and prompt user for a move
             self.display()
+            if self.recorder is not None:
+                self.recorder.flush()
             move = input("Enter move: ")
 
             # Exit game if user enters 'q'
             if move == 'q':
+                if self.recorder is not None:
+                    self.recorder.record_quit()
                 return
             elif not self.model.attempt_move(move):
                 print("Invalid move\n")
+            elif self.recorder is not None:
+                self.recorder.record_move(move, self.model)
+
+
+USAGE = """Usage: python a2.py [maze_file] [--viewport] [--record ARCHIVE]
+- maze_file: Maze to play, maze_files/maze2.txt by default.
+- --viewport: Show only a window around the player, for large mazes.
+- --record ARCHIVE: Record the session to the given archive file."""
+
+
+def usage_error(message: str) -> None:
+    """
+    Prints an error and the usage message to stderr, then exits with status 2.
+
+    Parameters:
+    - message (str): Description of what was wrong with the arguments.
+    """
+    print(f'{message}\n{USAGE}', file=sys.stderr)
+    sys.exit(2)
 
 
 def main():
     """
     The primary entry point for the Sokoban game.
-    Initializes the game with a specified maze file and starts the game loop.
+    Initializes the game with the maze file given on the command line and
+    starts the game loop. See USAGE for the arguments.
     """
+    maze_file = None
+    archive_file = None
+    view = None
+    recorder = None
+
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == '--viewport':
+            # Optional features are only imported when asked for, to keep
+            # startup fast
+            from viewport import ViewportView
+            view = ViewportView(minimap=True)
+        elif arg == '--record':
+            if not args or args[0].startswith('-'):
+                usage_error('--record needs an ARCHIVE file')
+            archive_file = args.pop(0)
+        elif arg in ('-h', '--help'):
+            print(USAGE)
+            return
+        elif arg.startswith('-'):
+            usage_error(f'Unknown option {arg}')
+        elif maze_file is not None:
+            usage_error(f'Unexpected argument {arg}')
+        else:
+            maze_file = arg
+
+    if maze_file is None:
+        maze_file = 'maze_files/maze2.txt'
+    if not os.path.isfile(maze_file):
+        usage_error(f'No maze file {maze_file}')
+
+    if archive_file is not None:
+        from recording import SessionRecorder
+        recorder = SessionRecorder(archive_file, maze_file)
 
     # Initialize the Sokoban game with the specified maze file
-    game = Sokoban('maze_files/maze2.txt')
+    game = Sokoban(maze_file, recorder, view)
+
+    # Start the game loop, closing the archive however the game ends
+    try:
+        game.play_game()
+    finally:
+        if recorder is not None:
+            recorder.close()
 
-    # Start the game loop
-    game.play_game()
-    
 
 if __name__ == '__main__':
     main()
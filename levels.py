@@ -0,0 +1,146 @@
+"""
+Precompiled level cache for fast game startup.
+
+Parsing a maze file is cheap for small mazes but grows with every cell. The
+parsed level (tile layout, initial entity table, player position and stats)
+is stored in a marshal file next to the maze, and reused as long as the maze
+file is unchanged: a matching modification time and size is trusted, and
+otherwise a matching content hash still saves the parse. load_cached does
+the same for any other data derived from a maze.
+"""
+import marshal
+import os
+
+from a2_support import *
+
+CACHE_SUFFIX = '.levelcache'
+FORMAT_VERSION = 1
+
+# A compiled level: (tile rows of WALL, FLOOR and GOAL, entity table of
+# (row, column, maze character) entries, player position, player stats).
+CompiledLevel = tuple
+
+
+def _file_digest(maze_file: str) -> bytes:
+    """
+    Returns the SHA-256 digest of a maze file's contents.
+    """
+    # hashlib is slow to import and only needed when the cache is stale
+    import hashlib
+
+    with open(maze_file, 'rb') as file:
+        return hashlib.sha256(file.read()).digest()
+
+
+def compile_level(maze_file: str) -> CompiledLevel:
+    """
+    Parses a maze file into its compiled form.
+
+    Parameters:
+    - maze_file (str): Path to the maze file.
+
+    Returns:
+    CompiledLevel: The compiled level.
+    """
+    raw_maze, player_stats = read_file(maze_file)
+
+    rows = []
+    entity_table = []
+    player_position = (0, 0)
+    for row_index, row in enumerate(raw_maze):
+        tiles = []
+        for column_index, cell in enumerate(row):
+            if cell in (WALL, GOAL, FLOOR):
+                tiles.append(cell)
+                continue
+            tiles.append(FLOOR)
+            if cell == PLAYER:
+                player_position = (row_index, column_index)
+            else:
+                entity_table.append((row_index, column_index, cell))
+        rows.append(''.join(tiles))
+
+    return (rows, entity_table, player_position, player_stats)
+
+
+def _write_cache(
+    path: str,
+    version: int,
+    status: os.stat_result,
+    digest: bytes,
+    data
+) -> None:
+    """
+    Writes a cache file, replacing it atomically. A cache that cannot be
+    written (e.g. a read-only directory) is skipped.
+    """
+    contents = marshal.dumps((version, status.st_mtime_ns, status.st_size,
+                              digest, data))
+    temporary = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temporary, 'wb') as file:
+            file.write(contents)
+        os.replace(temporary, path)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def load_cached(
+    maze_file: str,
+    suffix: str,
+    build,
+    version: int = FORMAT_VERSION
+):
+    """
+    Loads data derived from a maze file through a cache file next to it,
+    rebuilding the cache if the maze file has changed since it was written.
+
+    Parameters:
+    - maze_file (str): Path to the maze file.
+    - suffix (str): Added to the maze path to name the cache file.
+    - build (callable): Computes the data from the maze path. The data must
+      be made of types marshal can store.
+    - version (int): Format of the data; caches of other versions are rebuilt.
+
+    Returns:
+    The cached or freshly built data.
+    """
+    status = os.stat(maze_file)
+    path = maze_file + suffix
+    try:
+        with open(path, 'rb') as file:
+            cached_version, mtime_ns, size, cached_digest, data = \
+                marshal.loads(file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        cached_version = None
+
+    digest = None
+    if cached_version == version:
+        if mtime_ns == status.st_mtime_ns and size == status.st_size:
+            return data
+        digest = _file_digest(maze_file)
+        if digest == cached_digest:
+            _write_cache(path, version, status, digest, data)
+            return data
+
+    if digest is None:
+        digest = _file_digest(maze_file)
+    data = build(maze_file)
+    _write_cache(path, version, status, digest, data)
+    return data
+
+
+def load_level(maze_file: str) -> CompiledLevel:
+    """
+    Loads a maze through its compiled cache.
+
+    Parameters:
+    - maze_file (str): Path to the maze file.
+
+    Returns:
+    CompiledLevel: The parsed level.
+    """
+    return load_cached(maze_file, CACHE_SUFFIX, compile_level)
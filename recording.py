@@ -0,0 +1,424 @@
+"""
+Compact recording and seekable replay of Fancy Sokoban sessions.
+
+An archive names its maze file once by absolute path (with a hash of its
+contents), then stores the session as a stream of records: runs of moves
+packed 2 bits each, one-byte markers for undo and quit, and periodic
+checkpoints of the full game state. A replay seeks to any point by restoring
+the nearest earlier checkpoint and replaying at most a checkpoint interval of
+moves.
+
+Archive layout:
+    MAGIC, varint path length, maze path, 32-byte SHA-256 of the maze file,
+    then records, each starting with a tag byte:
+    - MOVES: varint count, then count moves packed 4 to a byte.
+    - UNDO, QUIT: no payload.
+    - CHECKPOINT: varint length, then the packed game state after every
+      event recorded so far.
+    - END: marks a cleanly closed archive. Without it, the archive was cut
+      off and replays up to its last complete record.
+"""
+import hashlib
+import os
+import struct
+import sys
+
+from a2_support import *
+
+MAGIC = b'FSR1'
+
+# Record tags
+MOVES = 0
+UNDO = 1
+QUIT = 2
+CHECKPOINT = 3
+END = 4
+
+# Moves are coded as their index here; events that are not moves use the
+# codes after them.
+MOVE_CODES = [UP, DOWN, LEFT, RIGHT]
+UNDO_EVENT = 4
+QUIT_EVENT = 5
+
+DEFAULT_CHECKPOINT_INTERVAL = 256
+
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    """
+    Appends a non-negative integer in LEB128 form (7 bits per byte).
+    """
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    """
+    Reads an integer written by _write_varint.
+
+    Returns:
+    tuple[int, int]: The value and the offset just after it.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _file_hash(maze_file: str) -> bytes:
+    """
+    Returns the SHA-256 digest of a maze file's contents.
+    """
+    with open(maze_file, 'rb') as file:
+        return hashlib.sha256(file.read()).digest()
+
+
+def pack_state(model) -> bytes:
+    """
+    Packs the parts of a SokobanModel that change during play.
+
+    Parameters:
+    - model (SokobanModel): Model to pack.
+
+    Returns:
+    bytes: Player position, strength and moves, the entity table and the
+    filled goals.
+    """
+    row, column = model.get_player_position()
+    data = bytearray(struct.pack('<HHii', row, column,
+                                 model.get_player_strength(),
+                                 model.get_player_moves_remaining()))
+
+    entities = model.get_entities()
+    _write_varint(data, len(entities))
+    for (row, column), entity in entities.items():
+        data += struct.pack('<HHc', row, column, entity.get_type().encode())
+        if entity.get_type() == CRATE:
+            _write_varint(data, entity.get_strength())
+
+    filled = [(row, column)
+              for row, tiles in enumerate(model.get_maze())
+              for column, tile in enumerate(tiles)
+              if tile.get_type() == GOAL and tile.is_filled()]
+    _write_varint(data, len(filled))
+    for row, column in filled:
+        data += struct.pack('<HH', row, column)
+    return bytes(data)
+
+
+def unpack_state(model, data: bytes) -> None:
+    """
+    Restores a state packed by pack_state onto a model of the same maze.
+
+    Parameters:
+    - model (SokobanModel): Freshly loaded model to restore onto.
+    - data (bytes): Packed state.
+    """
+    from a2 import Crate, FancyPotion, MovePotion, StrengthPotion
+
+    potions = {STRENGTH_POTION: StrengthPotion, MOVE_POTION: MovePotion,
+               FANCY_POTION: FancyPotion}
+    row, column, strength, moves = struct.unpack_from('<HHii', data)
+    model.player_position = (row, column)
+    model.player_strength = strength
+    model.player_moves = moves
+    offset = struct.calcsize('<HHii')
+
+    count, offset = _read_varint(data, offset)
+    entities = {}
+    for _ in range(count):
+        row, column, entity_type = struct.unpack_from('<HHc', data, offset)
+        offset += struct.calcsize('<HHc')
+        entity_type = entity_type.decode()
+        if entity_type == CRATE:
+            crate_strength, offset = _read_varint(data, offset)
+            entities[(row, column)] = Crate(crate_strength)
+        else:
+            entities[(row, column)] = potions[entity_type]()
+    model.entities = entities
+
+    count, offset = _read_varint(data, offset)
+    for _ in range(count):
+        row, column = struct.unpack_from('<HH', data, offset)
+        offset += struct.calcsize('<HH')
+        model.get_maze()[row][column].fill()
+
+
+class SessionRecorder:
+    """
+    Writes a session archive as the game is played.
+
+    The moves since the last marker form one open run. flush writes the run
+    so far, rewriting it in place as it grows, so flushing often costs no
+    extra space; the next marker or close ends the run. Runs never outgrow a
+    checkpoint interval, which bounds the rewriting.
+    """
+
+    def __init__(
+        self,
+        archive_file: str,
+        maze_file: str,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL
+    ) -> None:
+        """
+        Creates the archive and writes its header.
+
+        Parameters:
+        - archive_file (str): Path of the archive to create.
+        - maze_file (str): Path of the maze file being played. The archive
+          stores it as an absolute path.
+        - checkpoint_interval (int): Moves between checkpoints.
+        """
+        # Hashed first, so a missing maze leaves no empty archive behind
+        maze_hash = _file_hash(maze_file)
+        self.checkpoint_interval = checkpoint_interval
+        self.file = open(archive_file, 'wb')
+        self.pending = []
+        # Where the open run starts in the archive.
+        self.run_offset = None
+        # Moves since the last checkpoint, for each move still in effect.
+        self.depths = [0]
+
+        header = bytearray(MAGIC)
+        path = os.path.abspath(maze_file).encode('utf-8')
+        _write_varint(header, len(path))
+        header += path
+        header += maze_hash
+        self.file.write(header)
+
+    def _write_run(self) -> None:
+        """
+        Writes the open run as a single MOVES record at the end of the
+        archive, replacing what an earlier flush wrote of it.
+        """
+        if not self.pending:
+            return
+        data = bytearray([MOVES])
+        _write_varint(data, len(self.pending))
+        for index in range(0, len(self.pending), 4):
+            byte = 0
+            for shift, code in enumerate(self.pending[index:index + 4]):
+                byte |= code << (2 * shift)
+            data.append(byte)
+        self.file.seek(self.run_offset)
+        self.file.write(data)
+
+    def _flush_moves(self) -> None:
+        """
+        Writes and ends the open run.
+        """
+        self._write_run()
+        self.pending = []
+        self.run_offset = None
+
+    def _write_marker(self, tag: int, payload: bytes | None = None) -> None:
+        """
+        Writes a record that interrupts the current run of moves.
+        """
+        self._flush_moves()
+        data = bytearray([tag])
+        if payload is not None:
+            _write_varint(data, len(payload))
+            data += payload
+        self.file.write(data)
+
+    def record_move(self, direction: str, model) -> None:
+        """
+        Records a successful move, adding a checkpoint if one is due.
+
+        Parameters:
+        - direction (str): The move made.
+        - model (SokobanModel): The model after the move.
+        """
+        if self.run_offset is None:
+            self.run_offset = self.file.tell()
+        self.pending.append(MOVE_CODES.index(direction))
+        depth = self.depths[-1] + 1
+        if depth >= self.checkpoint_interval:
+            self._write_marker(CHECKPOINT, pack_state(model))
+            depth = 0
+        self.depths.append(depth)
+
+    def record_undo(self) -> None:
+        """
+        Records that the last move still in effect was undone.
+        """
+        self._write_marker(UNDO)
+        if len(self.depths) > 1:
+            self.depths.pop()
+
+    def flush(self) -> None:
+        """
+        Writes the open run so far and pushes the archive to disk, so that a
+        killed process loses only the moves made since.
+        """
+        self._write_run()
+        self.file.flush()
+
+    def record_quit(self) -> None:
+        """
+        Records that the player quit the game.
+        """
+        self._write_marker(QUIT)
+
+    def close(self) -> None:
+        """
+        Writes any buffered moves and the END record, then closes the archive.
+        """
+        self._write_marker(END)
+        self.file.close()
+
+
+class SessionPlayer:
+    """
+    Reads a session archive and rebuilds the game at any point in it.
+    """
+
+    def __init__(self, archive_file: str, maze_file: str | None = None) -> None:
+        """
+        Reads the archive and indexes its events and checkpoints.
+
+        Parameters:
+        - archive_file (str): Path of the archive to read.
+        - maze_file (str | None): Maze file to replay on, if it has moved
+          since recording. Defaults to the path stored in the archive.
+        """
+        with open(archive_file, 'rb') as file:
+            data = file.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f'{archive_file} is not a session archive')
+
+        try:
+            length, offset = _read_varint(data, len(MAGIC))
+        except IndexError:
+            length, offset = len(data), len(data)
+        if offset + length + 32 > len(data):
+            raise ValueError(f'{archive_file} is cut off in its header')
+        self.maze_file = data[offset:offset + length].decode('utf-8')
+        if maze_file is not None:
+            self.maze_file = maze_file
+        offset += length
+        self.maze_hash = data[offset:offset + 32]
+        offset += 32
+        self.archive_size = len(data)
+
+        self.events = bytearray()
+        self.checkpoints = {}
+        self.complete = False
+        while offset < len(data):
+            tag = data[offset]
+            # Find where the record's payload starts and ends. A record cut
+            # off by a killed process ends the events, leaving complete False.
+            try:
+                if tag == MOVES:
+                    count, start = _read_varint(data, offset + 1)
+                    end = start + (count + 3) // 4
+                elif tag == CHECKPOINT:
+                    length, start = _read_varint(data, offset + 1)
+                    end = start + length
+                else:
+                    start = end = offset + 1
+            except IndexError:
+                break
+            if end > len(data):
+                break
+
+            if tag == MOVES:
+                for index in range(count):
+                    byte = data[start + index // 4]
+                    self.events.append((byte >> (2 * (index % 4))) & 3)
+            elif tag == UNDO:
+                self.events.append(UNDO_EVENT)
+            elif tag == QUIT:
+                self.events.append(QUIT_EVENT)
+            elif tag == CHECKPOINT:
+                self.checkpoints[len(self.events)] = data[start:end]
+            elif tag == END:
+                self.complete = True
+                break
+            else:
+                raise ValueError(f'Unknown record tag {tag} in {archive_file}')
+            offset = end
+
+        # Frame k is the game after the first k events. effective[k] is the
+        # frame whose state frame k shares (undo and quit do not add a new
+        # one), and parent[k] the frame a move frame was made from.
+        self.effective = [0] * (len(self.events) + 1)
+        self.parent = {}
+        history = [0]
+        for frame, event in enumerate(self.events, 1):
+            if event < len(MOVE_CODES):
+                self.parent[frame] = history[-1]
+                history.append(frame)
+            elif event == UNDO_EVENT and len(history) > 1:
+                history.pop()
+            self.effective[frame] = history[-1]
+
+    def __len__(self) -> int:
+        """Returns the number of events recorded."""
+        return len(self.events)
+
+    def get_moves(self) -> list[str]:
+        """
+        Returns every event as a string: moves as their direction, undo as
+        'u' and quit as 'q'.
+        """
+        names = MOVE_CODES + ['u', 'q']
+        return [names[event] for event in self.events]
+
+    def frame(self, index: int):
+        """
+        Rebuilds the game after the first index events.
+
+        Parameters:
+        - index (int): Number of events to apply, from 0 to len(self).
+
+        Returns:
+        SokobanModel: A model in the state the game was in at that point.
+        """
+        from a2 import SokobanModel
+
+        if not 0 <= index <= len(self.events):
+            raise IndexError(f'Frame {index} is outside 0 to {len(self.events)}')
+        if _file_hash(self.maze_file) != self.maze_hash:
+            raise ValueError(f'{self.maze_file} has changed since recording')
+
+        frame = self.effective[index]
+        chain = []
+        while frame != 0 and frame not in self.checkpoints:
+            chain.append(frame)
+            frame = self.parent[frame]
+
+        model = SokobanModel(self.maze_file)
+        if frame != 0:
+            unpack_state(model, self.checkpoints[frame])
+        for frame in reversed(chain):
+            model.attempt_move(MOVE_CODES[self.events[frame - 1]])
+        return model
+
+    def bytes_per_thousand_moves(self) -> float:
+        """
+        Returns the archive size scaled to 1000 recorded events.
+        """
+        return self.archive_size * 1000 / max(len(self.events), 1)
+
+
+def main():
+    """
+    Prints a summary of each session archive given on the command line.
+    """
+    for archive_file in sys.argv[1:]:
+        player = SessionPlayer(archive_file)
+        print(f'{archive_file}: {player.maze_file}, {len(player)} events, '
+              f'{player.archive_size} bytes '
+              f'({player.bytes_per_thousand_moves():.0f} bytes per 1000 moves)')
+
+
+if __name__ == '__main__':
+    main()
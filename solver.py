@@ -0,0 +1,1139 @@
+"""
+Search-based solver for Fancy Sokoban levels.
+
+A level is reduced to a static Level (walls, goals and potion effects) plus a
+small hashable state tuple, so that breadth-first search can find the shortest
+winning sequence of moves. Results are stored in a SolutionCache keyed by a
+canonical hash of the level, so the same layout is never searched twice.
+"""
+import hashlib
+import heapq
+import itertools
+import os
+import sqlite3
+import sys
+import time
+import weakref
+from collections import deque
+
+from a2_support import *
+
+# A search state: (player position, crates, potions, filled goals, strength).
+# Crates are a sorted tuple of (position, strength) pairs and potions a sorted
+# tuple of (position, potion type) pairs, so equal states compare equal.
+State = tuple
+
+DEFAULT_MAX_STATES = 500000
+# The shared cache lives in the user's cache directory, wherever the solver
+# is called from. SOKOBAN_SOLUTION_CACHE overrides the path.
+DEFAULT_CACHE_PATH = os.environ.get('SOKOBAN_SOLUTION_CACHE') or os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+    'fancy_sokoban', 'solutions.sqlite3')
+DEFAULT_CACHE_ENTRIES = 1000
+
+
+class Level:
+    """
+    The static part of a maze that never changes while playing: which cells
+    can be walked on, where the goals are and what each potion type does.
+    """
+
+    def __init__(
+        self,
+        rows: tuple[str, ...],
+        potion_effects: dict[str, tuple[int, int]]
+    ) -> None:
+        """
+        Builds the level from its tile layout.
+
+        Parameters:
+        - rows (tuple[str, ...]): One string per maze row, made of WALL, FLOOR and GOAL.
+        - potion_effects (dict[str, tuple[int, int]]): Maps each potion type to
+          the (strength, moves) it grants.
+        """
+        open_cells = set()
+        goals = set()
+        for row_index, row in enumerate(rows):
+            for column_index, tile in enumerate(row):
+                if tile == WALL:
+                    continue
+                open_cells.add((row_index, column_index))
+                if tile == GOAL:
+                    goals.add((row_index, column_index))
+
+        self.rows = tuple(rows)
+        self.open_cells = frozenset(open_cells)
+        self.goals = frozenset(goals)
+        self.potion_effects = dict(potion_effects)
+
+    def is_won(self, state: State) -> bool:
+        """
+        Checks whether every goal in the level is filled in the given state.
+
+        Parameters:
+        - state (State): State to check.
+
+        Returns:
+        bool: True if all goals are filled, False otherwise.
+        """
+        return len(state[3]) == len(self.goals)
+
+
+def encode_game(
+    maze: Grid,
+    entities: Entities,
+    player_position: Position,
+    strength: int,
+    moves: int
+) -> tuple[Level, State, int]:
+    """
+    Converts a game in the representation used by SokobanModel into solver form.
+
+    Parameters:
+    - maze (Grid): 2D list of Tile objects.
+    - entities (Entities): Dictionary mapping positions to Entity objects.
+    - player_position (Position): Current position of the player.
+    - strength (int): Current strength of the player.
+    - moves (int): Number of moves the player has remaining.
+
+    Returns:
+    tuple[Level, State, int]: The static level, the current state and the
+    number of moves remaining.
+    """
+    rows = tuple(''.join(tile.get_type() for tile in row) for row in maze)
+    potion_effects = {}
+    for entity in entities.values():
+        if entity.get_type() in (STRENGTH_POTION, MOVE_POTION, FANCY_POTION):
+            effect = entity.effect()
+            potion_effects[entity.get_type()] = (effect.get('strength', 0),
+                                                 effect.get('moves', 0))
+
+    level = Level(rows, potion_effects)
+    crates = []
+    potions = []
+    for position, entity in entities.items():
+        if entity.get_type() == CRATE:
+            crates.append((position, entity.get_strength()))
+        elif entity.get_type() in level.potion_effects:
+            potions.append((position, entity.get_type()))
+
+    filled = frozenset(position for position in level.goals
+                       if maze[position[0]][position[1]].is_filled())
+    state = (player_position, tuple(sorted(crates)), tuple(sorted(potions)),
+             filled, strength)
+    return level, state, moves
+
+
+def encode_model(model) -> tuple[Level, State, int]:
+    """
+    Converts the current state of a SokobanModel into solver form.
+
+    Parameters:
+    - model (SokobanModel): Model to convert.
+
+    Returns:
+    tuple[Level, State, int]: See encode_game.
+    """
+    return encode_game(model.get_maze(), model.get_entities(),
+                       model.get_player_position(),
+                       model.get_player_strength(),
+                       model.get_player_moves_remaining())
+
+
+def encode_file(maze_file: str) -> tuple[Level, State, int]:
+    """
+    Reads a maze file and converts its starting position into solver form.
+
+    Parameters:
+    - maze_file (str): Path to the maze file.
+
+    Returns:
+    tuple[Level, State, int]: See encode_game.
+    """
+    from a2 import convert_maze
+
+    raw_maze, player_stats = read_file(maze_file)
+    maze, entities, player_position = convert_maze(raw_maze)
+    strength, moves = player_stats
+    return encode_game(maze, entities, player_position, strength, moves)
+
+
+def canonical_key(level: Level, state: State, moves: int) -> str:
+    """
+    Computes a hash that identifies a position independently of how it was
+    reached, for use as a cache key.
+
+    Parameters:
+    - level (Level): The static level.
+    - state (State): The current state.
+    - moves (int): Number of moves remaining.
+
+    Returns:
+    str: Hex digest identifying the position.
+    """
+    player, crates, potions, filled, strength = state
+    text = repr((level.rows, sorted(level.potion_effects.items()), player,
+                 crates, potions, sorted(filled), strength, moves))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def successors(level: Level, state: State) -> list[tuple[str, State, int]]:
+    """
+    Generates every state reachable with a single valid move, following the
+    same rules as SokobanModel.attempt_move.
+
+    Parameters:
+    - level (Level): The static level.
+    - state (State): The state to expand.
+
+    Returns:
+    list[tuple[str, State, int]]: (direction, new state, moves gained from a
+    potion) for every valid move.
+    """
+    player, crates, potions, filled, strength = state
+    crate_map = dict(crates)
+    potion_map = dict(potions)
+    result = []
+
+    for direction, (row_delta, column_delta) in DIRECTION_DELTAS.items():
+        target = (player[0] + row_delta, player[1] + column_delta)
+        if target not in level.open_cells:
+            continue
+
+        new_crates, new_filled = crates, filled
+        if target in crate_map:
+            beyond = (target[0] + row_delta, target[1] + column_delta)
+            if (beyond not in level.open_cells or beyond in crate_map
+                    or beyond in potion_map):
+                continue
+            if strength < crate_map[target]:
+                continue
+
+            moved = dict(crate_map)
+            crate_strength = moved.pop(target)
+            if beyond in level.goals:
+                new_filled = filled | {beyond}
+            else:
+                moved[beyond] = crate_strength
+            new_crates = tuple(sorted(moved.items()))
+
+        new_potions, new_strength, bonus = potions, strength, 0
+        if target in potion_map:
+            strength_gain, bonus = level.potion_effects[potion_map[target]]
+            new_strength += strength_gain
+            new_potions = tuple(potion for potion in potions
+                                if potion[0] != target)
+
+        result.append((direction, (target, new_crates, new_potions,
+                                   new_filled, new_strength), bonus))
+    return result
+
+
+class Solution:
+    """
+    The result of searching a level.
+
+    Attributes:
+    - moves (list[str] | None): Winning sequence of moves, or None if none was found.
+    - optimal (bool): True if the search was exhaustive, meaning the moves are
+      the shortest possible or, if moves is None, that the level cannot be won.
+    - states_seen (int): Number of distinct states discovered.
+    - states_expanded (int): Number of states whose moves were generated.
+    - elapsed (float): Time spent searching in seconds.
+    """
+
+    def __init__(
+        self,
+        moves: list[str] | None,
+        optimal: bool,
+        states_seen: int,
+        states_expanded: int,
+        elapsed: float
+    ) -> None:
+        """
+        Initializes the solution with the given result and statistics.
+        """
+        self.moves = moves
+        self.optimal = optimal
+        self.states_seen = states_seen
+        self.states_expanded = states_expanded
+        self.elapsed = elapsed
+
+    def get_moves(self) -> list[str] | None:
+        """Returns the winning moves, or None if no solution was found."""
+        return self.moves
+
+    def is_solved(self) -> bool:
+        """Returns True if a winning sequence of moves was found."""
+        return self.moves is not None
+
+    def is_optimal(self) -> bool:
+        """Returns True if the result is proven shortest or proven unwinnable."""
+        return self.optimal
+
+    def __repr__(self) -> str:
+        """Returns a summary of the solution, useful for debugging."""
+        moves = None if self.moves is None else ''.join(self.moves)
+        return (f'Solution(moves={moves!r}, optimal={self.optimal}, '
+                f'states_seen={self.states_seen}, '
+                f'states_expanded={self.states_expanded})')
+
+
+class BreadthFirstSearch:
+    """
+    A breadth-first search for the shortest winning sequence of moves that can
+    be paused at a deadline and resumed later.
+
+    States are deduplicated without their moves remaining: potion bonuses are
+    fixed by which potions are left, so the first (shallowest) visit to a
+    state always has the most moves in hand.
+    """
+
+    def __init__(
+        self,
+        level: Level,
+        state: State,
+        moves: int,
+        expand=successors,
+        reduce=None
+    ) -> None:
+        """
+        Prepares a search rooted at the given state.
+
+        Parameters:
+        - level (Level): The static level.
+        - state (State): The state to search from.
+        - moves (int): Number of moves remaining.
+        - expand (callable): Function used to generate successors, see successors.
+        - reduce (callable | None): Maps a state to the key used to detect
+          repeated states, so that equivalent states are searched only once.
+        """
+        self.level = level
+        self.root = state
+        self.moves = moves
+        self.expand = expand
+        self.reduce = reduce
+        self.parents = {state: None}
+        self.seen = self.parents if reduce is None else {reduce(state)}
+        self.frontier = deque([(state, moves, 0)])
+        # States already known from an earlier search, by depth, waiting to
+        # join the frontier when the search reaches the level before them.
+        self.pending = {}
+        self.depth = -1
+        self.expanded = 0
+        self.elapsed = 0.0
+        self.result = [] if level.is_won(state) else None
+        self.finished = self.result is not None
+
+    def run(
+        self,
+        deadline: float | None = None,
+        max_states: int | None = None
+    ) -> bool:
+        """
+        Continues the search until it finishes, the deadline passes or too
+        many states have been discovered.
+
+        Parameters:
+        - deadline (float | None): time.perf_counter() value to stop at.
+        - max_states (int | None): Stop once this many states have been discovered.
+
+        Returns:
+        bool: True if the search has finished, False if it was interrupted.
+        """
+        start = time.perf_counter()
+        level, parents, frontier = self.level, self.parents, self.frontier
+        seen, reduce = self.seen, self.reduce
+
+        while not self.finished and frontier:
+            if max_states is not None and len(parents) > max_states:
+                break
+            if (deadline is not None and self.expanded % 64 == 0
+                    and time.perf_counter() >= deadline):
+                break
+
+            current, remaining, depth = frontier.popleft()
+            if depth > self.depth:
+                self.depth = depth
+                frontier.extend(self.pending.pop(depth + 1, ()))
+            if remaining <= 0:
+                continue
+            self.expanded += 1
+
+            for direction, child, bonus in self.expand(level, current):
+                key = child if reduce is None else reduce(child)
+                if key in seen:
+                    continue
+                if reduce is not None:
+                    seen.add(key)
+                parents[child] = (current, direction)
+                if level.is_won(child):
+                    self.result = _trace_path(parents, child)
+                    self.finished = True
+                    break
+                frontier.append((child, remaining - 1 + bonus, depth + 1))
+        else:
+            self.finished = True
+
+        self.elapsed += time.perf_counter() - start
+        return self.finished
+
+    def _moves_gained(self, start: State, end: State) -> int:
+        """
+        Returns the moves granted by the potions collected between two states.
+        """
+        left = set(end[2])
+        return sum(self.level.potion_effects[potion_type][1]
+                   for position, potion_type in start[2]
+                   if (position, potion_type) not in left)
+
+    def reroot(self, state: State, moves: int) -> 'BreadthFirstSearch | None':
+        """
+        Starts a search from a state this search has already reached, keeping
+        the part of the tree below that state instead of starting over.
+
+        Every state in that subtree was first reached through the new root,
+        so its depth below the new root is its true distance from it. Those
+        states are queued level by level as the new search reaches them,
+        alongside any states the old search first reached by other routes.
+
+        Parameters:
+        - state (State): The new root.
+        - moves (int): Number of moves remaining at the new root.
+
+        Returns:
+        BreadthFirstSearch | None: The re-rooted search, or None if the state
+        is not in this tree, is reached here with a different number of moves,
+        or this search deduplicates with reduce.
+        """
+        if self.reduce is not None or state not in self.parents:
+            return None
+
+        old_depth = 0
+        node = state
+        while self.parents[node] is not None:
+            node = self.parents[node][0]
+            old_depth += 1
+        if self.moves + self._moves_gained(self.root, state) - old_depth != moves:
+            return None
+
+        relative = {state: 0}
+        if state != self.root:
+            relative[self.root] = -1
+        for node in self.parents:
+            path = []
+            while node not in relative:
+                path.append(node)
+                node = self.parents[node][0]
+            depth = relative[node]
+            for node in reversed(path):
+                depth = depth + 1 if depth >= 0 else -1
+                relative[node] = depth
+
+        search = BreadthFirstSearch(self.level, state, moves, self.expand)
+        won = None
+        for node, depth in relative.items():
+            if depth <= 0:
+                continue
+            search.parents[node] = self.parents[node]
+            search.pending.setdefault(depth, []).append(
+                (node, moves + self._moves_gained(state, node) - depth, depth))
+            if self.level.is_won(node) and (won is None or depth < won[1]):
+                won = (node, depth)
+        if won is not None:
+            search.result = _trace_path(search.parents, won[0])
+            search.finished = True
+        return search
+
+    def solution(self) -> Solution:
+        """
+        Returns the result of the search so far.
+
+        Returns:
+        Solution: The winning moves if found; optimal only once finished.
+        """
+        return Solution(self.result, self.finished, len(self.parents),
+                        self.expanded, self.elapsed)
+
+
+def search(
+    level: Level,
+    state: State,
+    moves: int,
+    max_states: int = DEFAULT_MAX_STATES
+) -> Solution:
+    """
+    Finds the shortest winning sequence of moves with breadth-first search.
+
+    Parameters:
+    - level (Level): The static level.
+    - state (State): The state to search from.
+    - moves (int): Number of moves remaining.
+    - max_states (int): Give up once this many states have been discovered.
+
+    Returns:
+    Solution: The search result.
+    """
+    bfs = BreadthFirstSearch(level, state, moves)
+    bfs.run(max_states=max_states)
+    return bfs.solution()
+
+
+def _trace_path(parents: dict, state: State) -> list[str]:
+    """
+    Follows parent links back to the root to recover the moves taken.
+
+    Parameters:
+    - parents (dict): Maps each state to (parent state, direction), or None for the root.
+    - state (State): The final state.
+
+    Returns:
+    list[str]: Directions from the root to the given state.
+    """
+    path = []
+    while parents[state] is not None:
+        state, direction = parents[state]
+        path.append(direction)
+    path.reverse()
+    return path
+
+
+class SolutionCache:
+    """
+    Persistent store of solutions keyed by cache_key, backed by SQLite so
+    that it can be shared safely between processes. Holds at most max_entries
+    solutions, evicting the least recently used ones.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_entries: int = DEFAULT_CACHE_ENTRIES
+    ) -> None:
+        """
+        Opens (creating it and its directory if necessary) the cache database.
+
+        Parameters:
+        - path (str): Path to the SQLite database file.
+        - max_entries (int): Maximum number of solutions to keep.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        with self.connection:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS solutions ('
+                ' key TEXT PRIMARY KEY,'
+                ' moves TEXT,'
+                ' optimal INTEGER NOT NULL,'
+                ' states_seen INTEGER NOT NULL,'
+                ' states_expanded INTEGER NOT NULL,'
+                ' elapsed REAL NOT NULL,'
+                ' last_used INTEGER NOT NULL)')
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS solutions_last_used'
+                ' ON solutions (last_used)')
+
+    def get(self, key: str) -> Solution | None:
+        """
+        Looks up a solution and marks it as recently used.
+
+        Parameters:
+        - key (str): Key from cache_key.
+
+        Returns:
+        Solution | None: The stored solution, or None if it is not cached.
+        """
+        with self.connection:
+            row = self.connection.execute(
+                'SELECT moves, optimal, states_seen, states_expanded, elapsed'
+                ' FROM solutions WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                'UPDATE solutions SET last_used = ? WHERE key = ?',
+                (time.time_ns(), key))
+
+        moves, optimal, states_seen, states_expanded, elapsed = row
+        return Solution(None if moves is None else list(moves), bool(optimal),
+                        states_seen, states_expanded, elapsed)
+
+    def put(self, key: str, solution: Solution) -> None:
+        """
+        Stores a solution, evicting the least recently used entries if the
+        cache is over capacity. An optimal entry is never replaced by a
+        non-optimal one.
+
+        Parameters:
+        - key (str): Key from cache_key.
+        - solution (Solution): Solution to store.
+        """
+        moves = None if solution.moves is None else ''.join(solution.moves)
+        with self.connection:
+            row = self.connection.execute(
+                'SELECT optimal FROM solutions WHERE key = ?', (key,)).fetchone()
+            if row is not None and row[0] and not solution.optimal:
+                return
+            self.connection.execute(
+                'INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, moves, int(solution.optimal), solution.states_seen,
+                 solution.states_expanded, solution.elapsed, time.time_ns()))
+            self.connection.execute(
+                'DELETE FROM solutions WHERE key NOT IN ('
+                ' SELECT key FROM solutions'
+                ' ORDER BY last_used DESC LIMIT ?)', (self.max_entries,))
+
+    def __len__(self) -> int:
+        """Returns the number of cached solutions."""
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM solutions').fetchone()[0]
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self.connection.close()
+
+
+_default_cache = None
+
+
+def resolve_cache(cache: SolutionCache | bool | None) -> SolutionCache | None:
+    """
+    Interprets the cache argument taken by the solving and hint functions.
+
+    Parameters:
+    - cache (SolutionCache | bool | None): A cache to use, None for the shared
+      cache at DEFAULT_CACHE_PATH (opened on first use), or False for no cache.
+
+    Returns:
+    SolutionCache | None: The cache to use, or None to skip caching.
+    """
+    global _default_cache
+    if cache is False:
+        return None
+    if cache is None or cache is True:
+        if _default_cache is None:
+            _default_cache = SolutionCache(DEFAULT_CACHE_PATH)
+        return _default_cache
+    return cache
+
+
+def cache_key(
+    level: Level,
+    state: State,
+    moves: int,
+    form: 'symmetry.CanonicalForm | None' = None
+) -> tuple[str, int]:
+    """
+    Computes the cache key of a position, shared by all 8 rotations and
+    reflections of it.
+
+    Parameters:
+    - level (Level): The static level.
+    - state (State): The current state.
+    - moves (int): Number of moves remaining.
+    - form (CanonicalForm | None): The level's canonical form, if already
+      worked out. Finding it transforms the whole layout.
+
+    Returns:
+    tuple[str, int]: The canonical_key of the canonical orientation, and the
+    symmetry mapping the position onto it.
+    """
+    if form is None:
+        # symmetry imports this module, so it is imported when first needed
+        import symmetry
+
+        form = symmetry.CanonicalForm(level)
+    state, orientation = form.canonical(state)
+    return canonical_key(form.level, state, moves), orientation
+
+
+def load_solution(
+    cache: SolutionCache,
+    key: str,
+    orientation: int
+) -> Solution | None:
+    """
+    Looks up a solution stored by store_solution.
+
+    Parameters:
+    - cache (SolutionCache): Cache to consult.
+    - key (str): Key from cache_key.
+    - orientation (int): Symmetry from cache_key.
+
+    Returns:
+    Solution | None: The stored solution with moves for the position's own
+    orientation, or None if it is not cached.
+    """
+    import symmetry
+
+    solution = cache.get(key)
+    if solution is not None and solution.is_solved():
+        solution.moves = symmetry.map_moves(solution.moves,
+                                            symmetry.inverse(orientation))
+    return solution
+
+
+def store_solution(
+    cache: SolutionCache,
+    key: str,
+    orientation: int,
+    solution: Solution
+) -> None:
+    """
+    Stores a conclusive solution with its moves in the canonical orientation.
+    A search that gave up says nothing about the position and is skipped.
+
+    Parameters:
+    - cache (SolutionCache): Cache to update.
+    - key (str): Key from cache_key.
+    - orientation (int): Symmetry from cache_key.
+    - solution (Solution): Solution for the position's own orientation.
+    """
+    import symmetry
+
+    if not (solution.is_solved() or solution.is_optimal()):
+        return
+    moves = solution.moves
+    if moves is not None:
+        moves = symmetry.map_moves(moves, orientation)
+    cache.put(key, Solution(moves, solution.optimal, solution.states_seen,
+                            solution.states_expanded, solution.elapsed))
+
+
+def solve(
+    level: Level,
+    state: State,
+    moves: int,
+    cache: SolutionCache | bool | None = None,
+    max_states: int = DEFAULT_MAX_STATES
+) -> Solution:
+    """
+    Solves a position, consulting the cache before starting a search. Every
+    orientation of a position shares one cache entry.
+
+    Only conclusive results are cached: a search that gives up after
+    max_states says nothing about the position.
+
+    Parameters:
+    - level (Level): The static level.
+    - state (State): The state to solve from.
+    - moves (int): Number of moves remaining.
+    - cache (SolutionCache | bool | None): Cache to consult and update, see
+      resolve_cache. Defaults to the shared cache.
+    - max_states (int): Search limit, see search.
+
+    Returns:
+    Solution: The search result.
+    """
+    cache = resolve_cache(cache)
+    if cache is None:
+        return search(level, state, moves, max_states)
+
+    key, orientation = cache_key(level, state, moves)
+    cached = load_solution(cache, key, orientation)
+    if cached is not None:
+        return cached
+
+    solution = search(level, state, moves, max_states)
+    store_solution(cache, key, orientation, solution)
+    return solution
+
+
+def solve_file(
+    maze_file: str,
+    cache: SolutionCache | bool | None = None
+) -> Solution:
+    """
+    Solves a maze file from its starting position.
+
+    Parameters:
+    - maze_file (str): Path to the maze file.
+    - cache (SolutionCache | bool | None): Cache to consult and update, see
+      resolve_cache. Defaults to the shared cache.
+
+    Returns:
+    Solution: The search result.
+    """
+    return solve(*encode_file(maze_file), cache=cache)
+
+
+def solve_model(model, cache: SolutionCache | bool | None = None) -> Solution:
+    """
+    Solves a game from the current state of a SokobanModel.
+
+    Parameters:
+    - model (SokobanModel): Model to solve from.
+    - cache (SolutionCache | bool | None): Cache to consult and update, see
+      resolve_cache. Defaults to the shared cache.
+
+    Returns:
+    Solution: The search result.
+    """
+    return solve(*encode_model(model), cache=cache)
+
+
+class Hint:
+    """
+    Advice for the player from a hint request.
+
+    Attributes:
+    - move (str | None): The suggested next move, or None if there is none.
+    - winnable (bool | None): True if a winning plan is known, False if the
+      level is proven unwinnable and None if the time budget ran out first.
+    - plan (list[str] | None): The full plan the move was taken from.
+    - optimal (bool): True if the plan is proven shortest.
+    """
+
+    def __init__(
+        self,
+        move: str | None,
+        winnable: bool | None,
+        plan: list[str] | None,
+        optimal: bool
+    ) -> None:
+        """
+        Initializes the hint with the given advice.
+        """
+        self.move = move
+        self.winnable = winnable
+        self.plan = plan
+        self.optimal = optimal
+
+    def get_move(self) -> str | None:
+        """Returns the suggested next move, or None if there is none."""
+        return self.move
+
+    def is_winnable(self) -> bool | None:
+        """Returns whether the level can still be won, or None if unknown."""
+        return self.winnable
+
+    def get_plan(self) -> list[str] | None:
+        """Returns the plan the suggested move was taken from."""
+        return self.plan
+
+    def is_optimal(self) -> bool:
+        """Returns True if the plan is proven to be the shortest."""
+        return self.optimal
+
+    def __repr__(self) -> str:
+        """Returns a summary of the hint, useful for debugging."""
+        return (f'Hint(move={self.move!r}, winnable={self.winnable}, '
+                f'optimal={self.optimal})')
+
+
+def _estimate(level: Level, state: State) -> int:
+    """
+    Rough distance to a win, used to order the greedy search. Not admissible.
+
+    Parameters:
+    - level (Level): The static level.
+    - state (State): The state to estimate.
+
+    Returns:
+    int: Sum of the shortest crate-to-open-goal distances, plus the distance
+    from the player to the nearest crate.
+    """
+    player, crates, potions, filled, strength = state
+    open_goals = [goal for goal in level.goals if goal not in filled]
+    if not open_goals or not crates:
+        return 0
+
+    distances = sorted(
+        min(abs(row - goal_row) + abs(column - goal_column)
+            for goal_row, goal_column in open_goals)
+        for (row, column), crate_strength in crates)
+    nearest_crate = min(abs(player[0] - row) + abs(player[1] - column)
+                        for (row, column), crate_strength in crates)
+    return sum(distances[:len(open_goals)]) + nearest_crate
+
+
+class _GreedySearch:
+    """
+    Quickly looks for any winning plan by always expanding the state that
+    looks closest to a win. Can be paused at a deadline and resumed later.
+    """
+
+    def __init__(
+        self,
+        level: Level,
+        state: State,
+        moves: int,
+        expand=successors
+    ) -> None:
+        """
+        Prepares a search rooted at the given state.
+
+        Parameters:
+        - level (Level): The static level.
+        - state (State): The state to search from.
+        - moves (int): Number of moves remaining.
+        - expand (callable): Function used to generate successors.
+        """
+        self.level = level
+        self.root = state
+        self.moves = moves
+        self.expand = expand
+        self.counter = itertools.count()
+        self.parents = {state: None}
+        self.heap = [(_estimate(level, state), next(self.counter), state, moves)]
+        self.expanded = 0
+        self.result = None
+        self.finished = False
+
+    def run(self, deadline: float) -> bool:
+        """
+        Continues the search until it finds a plan, runs out of states or
+        the deadline passes.
+
+        Parameters:
+        - deadline (float): time.perf_counter() value to stop at.
+
+        Returns:
+        bool: True if the search has finished, False if it was interrupted.
+        """
+        level, parents, heap = self.level, self.parents, self.heap
+        while not self.finished and heap:
+            if self.expanded % 64 == 0 and time.perf_counter() >= deadline:
+                return False
+
+            _, _, current, remaining = heapq.heappop(heap)
+            if remaining <= 0:
+                continue
+            self.expanded += 1
+
+            for direction, child, bonus in self.expand(level, current):
+                if child in parents:
+                    continue
+                parents[child] = (current, direction)
+                if level.is_won(child):
+                    self.result = _trace_path(parents, child)
+                    break
+                heapq.heappush(heap, (_estimate(level, child),
+                                      next(self.counter), child,
+                                      remaining - 1 + bonus))
+            else:
+                continue
+            break
+
+        self.finished = True
+        return True
+
+
+class HintSession:
+    """
+    Answers hint requests for one game, reusing work between hints.
+
+    Every state expanded by any hint is remembered, so the search after the
+    player's move mostly walks states it already knows. The last plan is kept
+    too: if the player followed it, the rest of the plan is an immediate
+    answer. Asking again without moving resumes both interrupted searches,
+    and after a move the breadth-first search is re-rooted onto the subtree
+    below the player's new state when it has already reached it.
+    """
+
+    def __init__(
+        self,
+        cache: SolutionCache | bool | None = None,
+        max_table_states: int = DEFAULT_MAX_STATES
+    ) -> None:
+        """
+        Initializes an empty session.
+
+        Parameters:
+        - cache (SolutionCache | bool | None): Cache to consult and update, see
+          resolve_cache. Defaults to the shared cache.
+        - max_table_states (int): Forget remembered expansions past this many states.
+        """
+        self.cache = resolve_cache(cache)
+        self.max_table_states = max_table_states
+        self._level = None
+        self._successors = {}
+        self._plan = None
+        self._plan_index = {}
+        self._plan_optimal = False
+        self._greedy = None
+        self._bfs = None
+        self._form = None
+
+    def _expand(self, level: Level, state: State) -> list[tuple[str, State, int]]:
+        """
+        Memoized version of successors shared by every search in the session.
+        """
+        children = self._successors.get(state)
+        if children is None:
+            if len(self._successors) >= self.max_table_states:
+                self._successors.clear()
+            children = self._successors[state] = successors(level, state)
+        return children
+
+    def _remember(
+        self,
+        level: Level,
+        state: State,
+        moves: int,
+        plan: list[str] | None,
+        optimal: bool
+    ) -> None:
+        """
+        Records the states along a plan so a later hint can pick it up again.
+        """
+        self._plan = plan
+        self._plan_optimal = optimal
+        self._plan_index = {}
+        if plan is None:
+            return
+
+        for index, direction in enumerate(plan):
+            self._plan_index[state] = (index, moves)
+            for child_direction, child, bonus in self._expand(level, state):
+                if child_direction == direction:
+                    state, moves = child, moves - 1 + bonus
+                    break
+
+    def _reuse_plan(self, state: State, moves: int) -> tuple[list[str] | None, bool]:
+        """
+        Looks the state up on the previous plan.
+
+        Returns:
+        tuple[list[str] | None, bool]: The rest of the plan, or None if the
+        state is not on it, and whether that rest is proven shortest.
+        """
+        if state not in self._plan_index:
+            return None, False
+        index, planned_moves = self._plan_index[state]
+        if moves < planned_moves:
+            return None, False
+        return self._plan[index:], self._plan_optimal and moves == planned_moves
+
+    def _cache_key(self, level: Level, state: State, moves: int) -> tuple[str, int]:
+        """
+        Computes the cache key of a position, see cache_key, working out the
+        level's canonical form only once per level.
+        """
+        if self._form is None:
+            import symmetry
+
+            self._form = symmetry.CanonicalForm(level)
+        return cache_key(level, state, moves, self._form)
+
+    def hint(self, model, time_budget_ms: int) -> Hint:
+        """
+        Suggests the next move from the current state of the game.
+
+        The search is anytime: a quick greedy search finds some plan, then a
+        breadth-first search replaces it with the shortest plan if it
+        finishes before the deadline.
+
+        Parameters:
+        - model (SokobanModel): The game to give a hint for.
+        - time_budget_ms (int): Time allowed for searching, in milliseconds.
+
+        Returns:
+        Hint: The suggested move and whether the level can still be won.
+        """
+        start = time.perf_counter()
+        deadline = start + time_budget_ms / 1000
+        level, state, moves = encode_model(model)
+        if (self._level is None or level.rows != self._level.rows
+                or level.potion_effects != self._level.potion_effects):
+            self._level = level
+            self._successors = {}
+            self._remember(level, state, moves, None, False)
+            self._greedy = None
+            self._bfs = None
+            self._form = None
+        level = self._level
+
+        if level.is_won(state):
+            return Hint(None, True, [], True)
+        if moves <= 0:
+            return Hint(None, False, None, True)
+
+        plan, optimal = self._reuse_plan(state, moves)
+        if (not optimal and self.cache is not None
+                and time.perf_counter() < deadline):
+            key, orientation = self._cache_key(level, state, moves)
+            cached = load_solution(self.cache, key, orientation)
+            if cached is not None and cached.is_optimal():
+                plan, optimal = cached.get_moves(), True
+
+        if plan is None and not optimal:
+            if (self._greedy is None or self._greedy.root != state
+                    or self._greedy.moves != moves):
+                self._greedy = _GreedySearch(level, state, moves, self._expand)
+            self._greedy.run((start + deadline) / 2)
+            plan = self._greedy.result
+
+        if not optimal:
+            if (self._bfs is None or self._bfs.root != state
+                    or self._bfs.moves != moves):
+                bfs = None
+                if self._bfs is not None:
+                    bfs = self._bfs.reroot(state, moves)
+                if bfs is None:
+                    bfs = BreadthFirstSearch(level, state, moves, self._expand)
+                self._bfs = bfs
+            if self._bfs.run(deadline):
+                plan, optimal = self._bfs.result, True
+                if self.cache is not None:
+                    key, orientation = self._cache_key(level, state, moves)
+                    store_solution(self.cache, key, orientation,
+                                   self._bfs.solution())
+
+        self._remember(level, state, moves, plan, optimal)
+        if plan is not None:
+            return Hint(plan[0], True, plan, optimal)
+        return Hint(None, False if optimal else None, None, optimal)
+
+
+_sessions = weakref.WeakKeyDictionary()
+
+
+def hint(
+    model,
+    time_budget_ms: int,
+    cache: SolutionCache | bool | None = None
+) -> Hint:
+    """
+    Suggests the next move from the current state of a game, reusing work
+    from earlier hints for the same model.
+
+    Parameters:
+    - model (SokobanModel): The game to give a hint for.
+    - time_budget_ms (int): Time allowed for searching, in milliseconds.
+    - cache (SolutionCache | bool | None): Cache to consult and update, see
+      resolve_cache. Defaults to the shared cache.
+
+    Returns:
+    Hint: The suggested move and whether the level can still be won.
+    """
+    cache = resolve_cache(cache)
+    session = _sessions.get(model)
+    if session is None or session.cache is not cache:
+        # An unresolved None would mean the shared cache to HintSession
+        session = _sessions[model] = HintSession(
+            False if cache is None else cache)
+    return session.hint(model, time_budget_ms)
+
+
+def main():
+    """
+    Solves each maze file given on the command line and prints the result.
+    """
+    for maze_file in sys.argv[1:]:
+        solution = solve_file(maze_file)
+        if solution.is_solved():
+            print(f'{maze_file}: {"".join(solution.get_moves())} '
+                  f'({len(solution.get_moves())} moves)')
+        elif solution.is_optimal():
+            print(f'{maze_file}: cannot be won')
+        else:
+            print(f'{maze_file}: no solution found within search limit')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,414 @@
+"""
+The 8 symmetries of the grid (rotations and reflections) for Fancy Sokoban.
+
+Mazes and game states that are mirror images or rotations of each other play
+identically once the moves are remapped. This module finds a canonical
+orientation for mazes and states, uses it to deduplicate collections of
+levels, and lets the solver skip states that are symmetric copies of ones it
+has already seen when the maze itself is symmetric.
+"""
+import sys
+
+from a2_support import *
+import solver
+
+# Each symmetry is (transpose, flip rows, flip columns): the rows and columns
+# are flipped first, then the grid is transposed. Index 0 is the identity.
+SYMMETRIES = [
+    (transpose, flip_rows, flip_columns)
+    for transpose in (False, True)
+    for flip_rows in (False, True)
+    for flip_columns in (False, True)
+]
+IDENTITY = 0
+
+
+def transform_position(
+    position: Position,
+    symmetry: int,
+    height: int,
+    width: int
+) -> Position:
+    """
+    Maps a position in a height x width grid to its place after a symmetry.
+
+    Parameters:
+    - position (Position): Position to map.
+    - symmetry (int): Index into SYMMETRIES.
+    - height (int): Number of rows in the original grid.
+    - width (int): Number of columns in the original grid.
+
+    Returns:
+    Position: The transformed position.
+    """
+    row, column = position
+    transpose, flip_rows, flip_columns = SYMMETRIES[symmetry]
+    if flip_rows:
+        row = height - 1 - row
+    if flip_columns:
+        column = width - 1 - column
+    if transpose:
+        row, column = column, row
+    return (row, column)
+
+
+def inverse(symmetry: int) -> int:
+    """
+    Finds the symmetry that undoes the given one.
+
+    Parameters:
+    - symmetry (int): Index into SYMMETRIES.
+
+    Returns:
+    int: Index of the inverse symmetry.
+    """
+    transpose, flip_rows, flip_columns = SYMMETRIES[symmetry]
+    if transpose:
+        flip_rows, flip_columns = flip_columns, flip_rows
+    return SYMMETRIES.index((transpose, flip_rows, flip_columns))
+
+
+def direction_map(symmetry: int) -> dict[str, str]:
+    """
+    Remaps DIRECTION_DELTAS under a symmetry.
+
+    Parameters:
+    - symmetry (int): Index into SYMMETRIES.
+
+    Returns:
+    dict[str, str]: Maps each direction in the original grid to the direction
+    with the same effect in the transformed grid.
+    """
+    transpose, flip_rows, flip_columns = SYMMETRIES[symmetry]
+    directions = {delta: direction
+                  for direction, delta in DIRECTION_DELTAS.items()}
+    mapping = {}
+    for direction, (row_delta, column_delta) in DIRECTION_DELTAS.items():
+        if flip_rows:
+            row_delta = -row_delta
+        if flip_columns:
+            column_delta = -column_delta
+        if transpose:
+            row_delta, column_delta = column_delta, row_delta
+        mapping[direction] = directions[(row_delta, column_delta)]
+    return mapping
+
+
+def map_moves(moves: list[str], symmetry: int) -> list[str]:
+    """
+    Maps moves made in one orientation to the matching moves after a symmetry.
+
+    To turn a solution of the canonical form back into moves for the original
+    maze, pass the inverse of the symmetry that produced the canonical form.
+
+    Parameters:
+    - moves (list[str]): Moves to map.
+    - symmetry (int): Index into SYMMETRIES.
+
+    Returns:
+    list[str]: The mapped moves.
+    """
+    mapping = direction_map(symmetry)
+    return [mapping[move] for move in moves]
+
+
+def _dimensions(rows: tuple[str, ...]) -> tuple[int, int]:
+    """
+    Returns the (height, width) of the smallest rectangle holding the rows.
+    """
+    return len(rows), max((len(row) for row in rows), default=0)
+
+
+def transform_rows(rows: tuple[str, ...], symmetry: int) -> tuple[str, ...]:
+    """
+    Applies a symmetry to a maze layout. Short rows are padded with walls,
+    which does not change the game since cells outside the maze block moves.
+
+    Parameters:
+    - rows (tuple[str, ...]): One string per maze row.
+    - symmetry (int): Index into SYMMETRIES.
+
+    Returns:
+    tuple[str, ...]: The transformed rows.
+    """
+    height, width = _dimensions(rows)
+    grid = [row.ljust(width, WALL) for row in rows]
+    transpose, flip_rows, flip_columns = SYMMETRIES[symmetry]
+    if flip_rows:
+        grid.reverse()
+    if flip_columns:
+        grid = [row[::-1] for row in grid]
+    if transpose:
+        grid = [''.join(column) for column in zip(*grid)]
+    return tuple(grid)
+
+
+def transform_state(
+    state: solver.State,
+    symmetry: int,
+    height: int,
+    width: int
+) -> solver.State:
+    """
+    Applies a symmetry to every position in a solver state.
+
+    Parameters:
+    - state (State): State to transform.
+    - symmetry (int): Index into SYMMETRIES.
+    - height (int): Number of rows in the original grid.
+    - width (int): Number of columns in the original grid.
+
+    Returns:
+    State: The transformed state.
+    """
+    player, crates, potions, filled, strength = state
+
+    def move(position: Position) -> Position:
+        return transform_position(position, symmetry, height, width)
+
+    return (move(player),
+            tuple(sorted((move(position), crate_strength)
+                         for position, crate_strength in crates)),
+            tuple(sorted((move(position), potion_type)
+                         for position, potion_type in potions)),
+            frozenset(move(position) for position in filled),
+            strength)
+
+
+def transform_level(level: solver.Level, symmetry: int) -> solver.Level:
+    """
+    Applies a symmetry to a level.
+
+    Parameters:
+    - level (Level): Level to transform.
+    - symmetry (int): Index into SYMMETRIES.
+
+    Returns:
+    Level: The transformed level.
+    """
+    return solver.Level(transform_rows(level.rows, symmetry),
+                        level.potion_effects)
+
+
+def _sort_key(rows: tuple[str, ...], state: solver.State) -> tuple:
+    """
+    Totally ordered form of a layout and state, used to pick a canonical one.
+    """
+    player, crates, potions, filled, strength = state
+    return (rows, player, crates, potions, tuple(sorted(filled)), strength)
+
+
+class CanonicalForm:
+    """
+    The canonical orientation of one level's layout, worked out once so that
+    any number of states on the level can be canonicalized by transforming
+    only the states.
+    """
+
+    def __init__(self, level: solver.Level) -> None:
+        """
+        Transforms the layout under every symmetry and keeps the ones that
+        sort first.
+
+        Parameters:
+        - level (Level): The static level.
+        """
+        self.height, self.width = _dimensions(level.rows)
+        layouts = [transform_rows(level.rows, symmetry)
+                   for symmetry in range(len(SYMMETRIES))]
+        rows = min(layouts)
+        self.level = solver.Level(rows, level.potion_effects)
+        # Usually one; more when the layout is itself symmetric, and then
+        # the state decides between them.
+        self.symmetries = [symmetry for symmetry, layout in enumerate(layouts)
+                           if layout == rows]
+
+    def canonical(self, state: solver.State) -> tuple[solver.State, int]:
+        """
+        Picks the orientation of a state that sorts first on the canonical
+        layout.
+
+        Parameters:
+        - state (State): A state on the original level.
+
+        Returns:
+        tuple[State, int]: The canonical state, and the index of the symmetry
+        that maps the original onto it.
+        """
+        best = None
+        for symmetry in self.symmetries:
+            new_state = transform_state(state, symmetry, self.height, self.width)
+            key = _sort_key((), new_state)
+            if best is None or key < best[0]:
+                best = (key, new_state, symmetry)
+        return best[1], best[2]
+
+
+def canonical_game(
+    level: solver.Level,
+    state: solver.State
+) -> tuple[solver.Level, solver.State, int]:
+    """
+    Picks the orientation of a game that sorts first, so that all 8
+    orientations of the same game share one canonical form.
+
+    Parameters:
+    - level (Level): The static level.
+    - state (State): The current state.
+
+    Returns:
+    tuple[Level, State, int]: The canonical level and state, and the index of
+    the symmetry that maps the original onto them.
+    """
+    form = CanonicalForm(level)
+    state, symmetry = form.canonical(state)
+    return form.level, state, symmetry
+
+
+def canonical_maze(maze_file: str) -> tuple[solver.Level, solver.State, int, int]:
+    """
+    Reads a maze file and returns the canonical form of its starting position.
+
+    Parameters:
+    - maze_file (str): Path to the maze file.
+
+    Returns:
+    tuple[Level, State, int, int]: The canonical level and state, the moves
+    the player starts with, and the symmetry mapping the file onto them.
+    """
+    level, state, moves = solver.encode_file(maze_file)
+    level, state, symmetry = canonical_game(level, state)
+    return level, state, moves, symmetry
+
+
+def deduplicate(maze_files: list[str]) -> dict[str, list[str]]:
+    """
+    Groups maze files that are the same level up to rotation and reflection.
+
+    Parameters:
+    - maze_files (list[str]): Paths to the maze files.
+
+    Returns:
+    dict[str, list[str]]: Maps the canonical key of each distinct level to
+    the files holding it, in the order they were given.
+    """
+    groups = {}
+    for maze_file in maze_files:
+        level, state, moves, symmetry = canonical_maze(maze_file)
+        key = solver.canonical_key(level, state, moves)
+        groups.setdefault(key, []).append(maze_file)
+    return groups
+
+
+def symmetry_group(level: solver.Level) -> list[int]:
+    """
+    Finds the symmetries that leave a level's layout unchanged.
+
+    Parameters:
+    - level (Level): Level to check.
+
+    Returns:
+    list[int]: Indices into SYMMETRIES, always including IDENTITY.
+    """
+    padded = transform_rows(level.rows, IDENTITY)
+    return [symmetry for symmetry in range(len(SYMMETRIES))
+            if transform_rows(level.rows, symmetry) == padded]
+
+
+def state_reducer(level: solver.Level):
+    """
+    Builds a function mapping each state to a key shared by all its symmetric
+    copies under the level's own symmetries, for BreadthFirstSearch's reduce.
+
+    Parameters:
+    - level (Level): The static level.
+
+    Returns:
+    callable | None: The reducer, or None if the level has no symmetry.
+    """
+    group = symmetry_group(level)
+    if len(group) == 1:
+        return None
+    height, width = _dimensions(level.rows)
+
+    def reduce(state: solver.State) -> tuple:
+        return min(_sort_key((), transform_state(state, symmetry,
+                                                 height, width))
+                   for symmetry in group)
+
+    return reduce
+
+
+def search(
+    level: solver.Level,
+    state: solver.State,
+    moves: int,
+    max_states: int = solver.DEFAULT_MAX_STATES
+) -> solver.Solution:
+    """
+    Like solver.search, but treats states that are symmetric copies under the
+    level's own symmetries as the same, shrinking the search on symmetric mazes.
+
+    Parameters:
+    - level (Level): The static level.
+    - state (State): The state to search from.
+    - moves (int): Number of moves remaining.
+    - max_states (int): Give up once this many states have been discovered.
+
+    Returns:
+    Solution: The search result.
+    """
+    bfs = solver.BreadthFirstSearch(level, state, moves,
+                                    reduce=state_reducer(level))
+    bfs.run(max_states=max_states)
+    return bfs.solution()
+
+
+def solve(
+    level: solver.Level,
+    state: solver.State,
+    moves: int,
+    cache: solver.SolutionCache | bool | None = None
+) -> solver.Solution:
+    """
+    Like solver.solve, but searches the canonical form of the game with
+    symmetric copies of states merged, and maps the moves back to the given
+    orientation.
+
+    Parameters:
+    - level (Level): The static level.
+    - state (State): The state to solve from.
+    - moves (int): Number of moves remaining.
+    - cache (SolutionCache | bool | None): Cache to consult and update, see
+      solver.resolve_cache. Defaults to the shared cache.
+
+    Returns:
+    Solution: The search result, with moves for the given orientation.
+    """
+    cache = solver.resolve_cache(cache)
+    canonical_level, canonical_state, symmetry = canonical_game(level, state)
+    key = solver.canonical_key(canonical_level, canonical_state, moves)
+    if cache is not None:
+        cached = solver.load_solution(cache, key, symmetry)
+        if cached is not None:
+            return cached
+
+    solution = search(canonical_level, canonical_state, moves)
+    if solution.is_solved():
+        solution.moves = map_moves(solution.moves, inverse(symmetry))
+    if cache is not None:
+        solver.store_solution(cache, key, symmetry, solution)
+    return solution
+
+
+def main():
+    """
+    Prints the groups of maze files given on the command line that are the
+    same level up to rotation and reflection.
+    """
+    for maze_files in deduplicate(sys.argv[1:]).values():
+        print(' '.join(maze_files))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,527 @@
+"""
+Precomputed distance tables and potion route planning for Fancy Sokoban.
+
+MazeTables holds, for one maze layout, the walking distance between every
+pair of open cells and, for every goal, the number of pushes needed to bring
+a crate there from each cell. Distances treat crates as movable, so other
+entities are ignored: they are lower bounds for the real game. Tables are
+built once per maze, cached next to the maze file and answer each query in
+O(1). Mazes too large for all-pairs tables get distances from the cells
+asked about instead, searched on first use and kept for the most recent
+ones.
+
+PotionRoutes uses the walking distances to choose which potions to collect,
+and in what order, before reaching a crate that needs more strength. The
+routes are found once per starting point and then checked against each
+target.
+"""
+import sys
+from array import array
+from collections import deque
+
+from a2_support import *
+from levels import load_cached, load_level
+
+TABLES_SUFFIX = '.tables'
+TABLES_VERSION = 1
+# All-pairs distances take two bytes per pair of open cells. Larger mazes
+# search on demand and keep the latest MAX_ON_DEMAND_TABLES searches.
+MAX_TABLE_CELLS = 4096
+MAX_ON_DEMAND_TABLES = 64
+MAX_PLANNER_POTIONS = 12
+UNREACHABLE = 0xFFFF
+
+
+def _unreachable(distances: array) -> int:
+    """
+    Returns the value marking cells with no path in a distance array: the
+    largest its type can hold, UNREACHABLE for the all-pairs tables.
+    """
+    return (1 << 8 * distances.itemsize) - 1
+
+
+def _breadth_first(
+    start: Position,
+    cells: dict[Position, int],
+    neighbours,
+    typecode: str = 'H'
+) -> array:
+    """
+    Computes the distance from start to every cell.
+
+    Parameters:
+    - start (Position): Cell to measure from.
+    - cells (dict[Position, int]): Maps each open cell to its index.
+    - neighbours (callable): Maps a cell to the cells one step away.
+    - typecode (str): Array type of the distances, 'H' unless paths may be
+      65535 steps or longer.
+
+    Returns:
+    array: Distance to each cell by index, the largest value of the type if
+    there is no path.
+    """
+    distances = array(typecode)
+    unreachable = _unreachable(distances)
+    distances.append(unreachable)
+    distances *= len(cells)
+    distances[cells[start]] = 0
+    frontier = deque([start])
+    while frontier:
+        cell = frontier.popleft()
+        distance = distances[cells[cell]] + 1
+        for neighbour in neighbours(cell):
+            index = cells[neighbour]
+            if distances[index] == unreachable:
+                distances[index] = distance
+                frontier.append(neighbour)
+    return distances
+
+
+class MazeTables:
+    """
+    Walking and push distance tables for one maze layout.
+
+    Mazes with more than MAX_TABLE_CELLS open cells are not tabulated: each
+    query searches from one of its cells instead, and the latest
+    MAX_ON_DEMAND_TABLES searches are kept for the queries after it.
+    """
+
+    def __init__(
+        self,
+        rows: list[str],
+        walking: bytes | None = None,
+        pushes: dict[Position, bytes] | None = None
+    ) -> None:
+        """
+        Builds the tables for a tile layout, or wraps tables built earlier.
+
+        Parameters:
+        - rows (list[str]): Tile layout, one string of WALL, FLOOR and GOAL per row.
+        - walking (bytes | None): Walking table from an earlier build.
+        - pushes (dict[Position, bytes] | None): Push tables from an earlier build.
+        """
+        self.rows = rows
+        self.cells = [(row, column)
+                      for row, tiles in enumerate(rows)
+                      for column, tile in enumerate(tiles) if tile != WALL]
+        self.index = {cell: index for index, cell in enumerate(self.cells)}
+        self.goals = [cell for cell in self.cells
+                      if rows[cell[0]][cell[1]] == GOAL]
+        self.tabulated = len(self.cells) <= MAX_TABLE_CELLS
+        # Searches made on demand for untabulated mazes, by source cell.
+        self.walking_from = {}
+
+        if not self.tabulated:
+            self.walking = None
+        elif walking is None:
+            self.walking = array('H')
+            for cell in self.cells:
+                self.walking += _breadth_first(cell, self.index, self._steps)
+        else:
+            self.walking = array('H', walking)
+
+        if pushes is None:
+            self.pushes = {}
+            if self.tabulated:
+                self.pushes = {goal: _breadth_first(goal, self.index,
+                                                    self._reverse_pushes)
+                               for goal in self.goals}
+        else:
+            self.pushes = {tuple(goal): array('H', table)
+                           for goal, table in pushes.items()}
+
+    def _steps(self, cell: Position) -> list[Position]:
+        """
+        Returns the open cells the player can walk to from a cell.
+        """
+        row, column = cell
+        return [(row + row_delta, column + column_delta)
+                for row_delta, column_delta in DIRECTION_DELTAS.values()
+                if (row + row_delta, column + column_delta) in self.index]
+
+    def _reverse_pushes(self, cell: Position) -> list[Position]:
+        """
+        Returns the cells a crate could have been pushed to this cell from:
+        the cell one step back must be open, and so must the one behind it
+        for the player to push from.
+        """
+        row, column = cell
+        origins = []
+        for row_delta, column_delta in DIRECTION_DELTAS.values():
+            origin = (row - row_delta, column - column_delta)
+            player = (row - 2 * row_delta, column - 2 * column_delta)
+            if origin in self.index and player in self.index:
+                origins.append(origin)
+        return origins
+
+    def _forward_pushes(self, cell: Position) -> list[Position]:
+        """
+        Returns the cells a crate on this cell can be pushed to.
+        """
+        row, column = cell
+        targets = []
+        for row_delta, column_delta in DIRECTION_DELTAS.values():
+            target = (row + row_delta, column + column_delta)
+            player = (row - row_delta, column - column_delta)
+            if target in self.index and player in self.index:
+                targets.append(target)
+        return targets
+
+    def _search(self, found: dict, cell: Position, neighbours) -> array:
+        """
+        Returns the distances from a cell in an untabulated maze, searching
+        unless a recent query already did.
+        """
+        distances = found.pop(cell, None)
+        if distances is None:
+            distances = _breadth_first(cell, self.index, neighbours, 'I')
+            if len(found) >= MAX_ON_DEMAND_TABLES:
+                del found[next(iter(found))]
+        found[cell] = distances
+        return distances
+
+    def walking_distance(self, start: Position, end: Position) -> int | None:
+        """
+        Returns the fewest moves to walk between two open cells, or None if
+        walls separate them.
+        """
+        if self.tabulated:
+            distances = self.walking
+            distance = distances[self.index[start] * len(self.cells)
+                                 + self.index[end]]
+        else:
+            # Walking is symmetric, so a search from either end will do
+            if end in self.walking_from and start not in self.walking_from:
+                start, end = end, start
+            distances = self._search(self.walking_from, start, self._steps)
+            distance = distances[self.index[end]]
+        return None if distance == _unreachable(distances) else distance
+
+    def push_distance(self, crate: Position, goal: Position) -> int | None:
+        """
+        Returns the fewest pushes to move a crate from a cell onto a goal, or
+        None if it cannot be pushed there.
+        """
+        if self.tabulated:
+            distances = self.pushes[goal]
+        else:
+            distances = self._search(self.pushes, goal, self._reverse_pushes)
+        distance = distances[self.index[crate]]
+        return None if distance == _unreachable(distances) else distance
+
+    def push_distances(self, crate: Position) -> dict[Position, int]:
+        """
+        Returns the fewest pushes to move a crate from a cell onto each goal
+        it can reach. Untabulated mazes search forwards from the crate once
+        rather than backwards from every goal.
+        """
+        if self.tabulated:
+            distances = {goal: self.push_distance(crate, goal)
+                         for goal in self.goals}
+            return {goal: distance for goal, distance in distances.items()
+                    if distance is not None}
+        distances = _breadth_first(crate, self.index, self._forward_pushes, 'I')
+        unreachable = _unreachable(distances)
+        return {goal: distances[self.index[goal]] for goal in self.goals
+                if distances[self.index[goal]] != unreachable}
+
+    def push_position(self, crate: Position, goal: Position) -> Position | None:
+        """
+        Returns where the player must stand for the first push of a shortest
+        push route from a cell to a goal, or None if there is no route.
+        """
+        remaining = self.push_distance(crate, goal)
+        if not remaining:
+            return None
+        row, column = crate
+        for row_delta, column_delta in DIRECTION_DELTAS.values():
+            target = (row + row_delta, column + column_delta)
+            player = (row - row_delta, column - column_delta)
+            if (target in self.index and player in self.index
+                    and self.push_distance(target, goal) == remaining - 1):
+                return player
+        return None
+
+    def dump(self) -> tuple:
+        """
+        Returns the tables in a form marshal can store. Untabulated mazes
+        store only their layout.
+        """
+        if not self.tabulated:
+            return (self.rows, None, {})
+        return (self.rows, self.walking.tobytes(),
+                {goal: table.tobytes() for goal, table in self.pushes.items()})
+
+
+def _build_tables(maze_file: str) -> tuple:
+    """
+    Builds the tables for a maze file in the form stored in its cache.
+    """
+    rows = load_level(maze_file)[0]
+    return MazeTables(rows).dump()
+
+
+def load_tables(maze_file: str) -> MazeTables:
+    """
+    Loads the tables for a maze file, building and caching them next to the
+    maze if they are missing or the maze has changed.
+
+    Parameters:
+    - maze_file (str): Path to the maze file.
+
+    Returns:
+    MazeTables: The tables for the maze.
+    """
+    rows, walking, pushes = load_cached(maze_file, TABLES_SUFFIX, _build_tables,
+                                        TABLES_VERSION)
+    return MazeTables(rows, walking, pushes)
+
+
+class PotionPlan:
+    """
+    A route that collects potions on the way to a target cell.
+
+    Attributes:
+    - potions (list[Position]): Potions to collect, in order.
+    - moves (int): Moves walked to reach the target.
+    - strength (int): Player strength on arrival.
+    - moves_remaining (int): Moves left on arrival.
+    """
+
+    def __init__(
+        self,
+        potions: list[Position],
+        moves: int,
+        strength: int,
+        moves_remaining: int
+    ) -> None:
+        """
+        Initializes the plan with the given route.
+        """
+        self.potions = potions
+        self.moves = moves
+        self.strength = strength
+        self.moves_remaining = moves_remaining
+
+    def __repr__(self) -> str:
+        """Returns a summary of the plan, useful for debugging."""
+        return (f'PotionPlan(potions={self.potions}, moves={self.moves}, '
+                f'strength={self.strength}, '
+                f'moves_remaining={self.moves_remaining})')
+
+
+class PotionRoutes:
+    """
+    Every way to collect potions from a starting point without running out
+    of moves, found once so that routes to any number of targets can be
+    planned from it.
+
+    The routes come from a dynamic program over (potions collected, last
+    potion), which considers every subset and order of potions, so only the
+    MAX_PLANNER_POTIONS potions nearest to the start take part.
+    """
+
+    def __init__(
+        self,
+        tables: MazeTables,
+        start: Position,
+        strength: int,
+        moves: int,
+        potions: list[tuple[Position, tuple[int, int]]]
+    ) -> None:
+        """
+        Finds the shortest walk to each (potions collected, last potion) state.
+
+        Parameters:
+        - tables (MazeTables): Tables for the maze.
+        - start (Position): Where the player starts.
+        - strength (int): Player strength at the start.
+        - moves (int): Moves remaining at the start.
+        - potions (list[tuple[Position, tuple[int, int]]]): Position and
+          (strength, moves) effect of each potion available.
+        """
+        self.tables = tables
+        self.start = start
+        self.strength = strength
+        self.moves = moves
+        potions = sorted(potions,
+                         key=lambda potion: self._distance(start, potion[0]))
+        self.potions = potions[:MAX_PLANNER_POTIONS]
+        count = len(self.potions)
+
+        # best[(mask, last)] = (moves walked, previous state)
+        best = {}
+        for index, (position, effect) in enumerate(self.potions):
+            walk = self._distance(start, position)
+            if walk <= moves:
+                best[(1 << index, index)] = (walk, None)
+
+        for mask in range(1, 1 << count):
+            gained = sum(self.potions[index][1][1] for index in range(count)
+                         if mask >> index & 1)
+            for last in range(count):
+                if (mask, last) not in best:
+                    continue
+                walked = best[(mask, last)][0]
+                remaining = moves + gained - walked
+                for following in range(count):
+                    if mask >> following & 1:
+                        continue
+                    walk = self._distance(self.potions[last][0],
+                                          self.potions[following][0])
+                    state = (mask | 1 << following, following)
+                    if walk <= remaining and (state not in best
+                                              or walked + walk < best[state][0]):
+                        best[state] = (walked + walk, (mask, last))
+        self.best = best
+
+        # Where each route ends: (state, last potion, moves walked, strength
+        # and moves gained), with the route that collects nothing first.
+        self.ends = [((0, None), None, 0, 0, 0)]
+        for (mask, last), (walked, _) in best.items():
+            collected = [self.potions[index][1] for index in range(count)
+                         if mask >> index & 1]
+            self.ends.append(((mask, last), last, walked,
+                              sum(effect[0] for effect in collected),
+                              sum(effect[1] for effect in collected)))
+
+    def _distance(self, start: Position, end: Position) -> int:
+        """
+        Returns the walking distance between two cells, UNREACHABLE if there
+        is no path.
+        """
+        walk = self.tables.walking_distance(start, end)
+        return UNREACHABLE if walk is None else walk
+
+    def plan(self, target: Position, required_strength: int) -> PotionPlan | None:
+        """
+        Finds the shortest route that reaches a target with enough strength.
+
+        Parameters:
+        - target (Position): Where the player must end up, with a move to spare.
+        - required_strength (int): Strength needed on arrival.
+
+        Returns:
+        PotionPlan | None: The best plan, or None if no plan works.
+        """
+        # Only the start and the potions can end a route
+        to_target = [self._distance(position, target)
+                     for position, effect in self.potions]
+        from_start = self._distance(self.start, target)
+
+        plan = None
+        for state, last, walked, gained_strength, gained_moves in self.ends:
+            if self.strength + gained_strength < required_strength:
+                continue
+            walk = from_start if last is None else to_target[last]
+            remaining = self.moves + gained_moves - walked - walk
+            if walk == UNREACHABLE or remaining < 1:
+                continue
+            if plan is None or (walked + walk, -remaining) < (plan[0], -plan[3]):
+                plan = (walked + walk, state,
+                        self.strength + gained_strength, remaining)
+
+        if plan is None:
+            return None
+        total, state, final_strength, remaining = plan
+        order = []
+        while state is not None and state[1] is not None:
+            order.append(self.potions[state[1]][0])
+            state = self.best[state][1]
+        order.reverse()
+        return PotionPlan(order, total, final_strength, remaining)
+
+
+def plan_potions(
+    tables: MazeTables,
+    start: Position,
+    strength: int,
+    moves: int,
+    potions: list[tuple[Position, tuple[int, int]]],
+    target: Position,
+    required_strength: int
+) -> PotionPlan | None:
+    """
+    Finds the shortest walk from start to target that collects enough
+    potions to reach the required strength, without running out of moves.
+    To plan routes to several targets from the same start, build a
+    PotionRoutes once instead.
+
+    Parameters:
+    - tables (MazeTables): Tables for the maze.
+    - start (Position): Where the player starts.
+    - strength (int): Player strength at the start.
+    - moves (int): Moves remaining at the start.
+    - potions (list[tuple[Position, tuple[int, int]]]): Position and
+      (strength, moves) effect of each potion available.
+    - target (Position): Where the player must end up, with a move to spare.
+    - required_strength (int): Strength needed on arrival.
+
+    Returns:
+    PotionPlan | None: The best plan, or None if no plan works.
+    """
+    routes = PotionRoutes(tables, start, strength, moves, potions)
+    return routes.plan(target, required_strength)
+
+
+def plan_crates(maze_file: str) -> dict[Position, tuple[Position, PotionPlan] | None]:
+    """
+    For every crate in a maze, finds the goal it can be pushed to in the
+    fewest pushes and the best potion route to the first push.
+
+    Parameters:
+    - maze_file (str): Path to the maze file.
+
+    Returns:
+    dict[Position, tuple[Position, PotionPlan] | None]: Maps each crate to its
+    goal and plan, or to None if no goal can be reached in time.
+    """
+    from a2 import FancyPotion, MovePotion, StrengthPotion
+
+    effects = {}
+    for potion in (StrengthPotion(), MovePotion(), FancyPotion()):
+        effect = potion.effect()
+        effects[potion.get_type()] = (effect.get('strength', 0),
+                                      effect.get('moves', 0))
+
+    rows, entity_table, player_position, player_stats = load_level(maze_file)
+    strength, moves = player_stats
+    tables = load_tables(maze_file)
+    potions = [((row, column), effects[cell])
+               for row, column, cell in entity_table if cell in effects]
+
+    routes = PotionRoutes(tables, player_position, strength, moves, potions)
+    plans = {}
+    for row, column, cell in entity_table:
+        if cell in effects:
+            continue
+        crate = (row, column)
+        plans[crate] = None
+        goals = [(pushes, goal)
+                 for goal, pushes in tables.push_distances(crate).items()
+                 if pushes]
+        for pushes, goal in sorted(goals):
+            plan = routes.plan(tables.push_position(crate, goal), int(cell))
+            if plan is not None:
+                plans[crate] = (goal, plan)
+                break
+    return plans
+
+
+def main():
+    """
+    Prints the potion route to each crate for each maze file given on the
+    command line.
+    """
+    for maze_file in sys.argv[1:]:
+        print(maze_file)
+        for crate, plan in plan_crates(maze_file).items():
+            if plan is None:
+                print(f'  crate at {crate}: no goal reachable in time')
+            else:
+                goal, route = plan
+                print(f'  crate at {crate} -> goal {goal}: {route}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Round-trip checks for recording.py: every frame of a replay must match the
+game as it was while the session was recorded.
+
+Run with `python -m unittest test_recording` or `python -m pytest`.
+"""
+import os
+import random
+import tempfile
+import unittest
+
+from a2 import SokobanModel
+from recording import SessionPlayer, SessionRecorder, pack_state, unpack_state
+
+MAZE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'maze_files', 'maze3.txt')
+DIRECTIONS = ['w', 's', 'a', 'd']
+
+
+class RecordingRoundTripTest(unittest.TestCase):
+    """
+    Records random sessions and compares each replayed frame with a snapshot
+    of the live model taken after the same event.
+    """
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.archive_file = os.path.join(directory.name, 'session.rec')
+
+    def record(
+        self,
+        events: int,
+        undo_rate: float,
+        seed: int,
+        checkpoint_interval: int = 3,
+        maze_file: str = MAZE_FILE
+    ) -> list[bytes]:
+        """
+        Plays random moves, undoing some of them, and records the session.
+        Without undo, recording stops early if the player runs out of moves.
+
+        Returns:
+        list[bytes]: The packed live state after each event, starting with
+        the initial state.
+        """
+        rng = random.Random(seed)
+        recorder = SessionRecorder(self.archive_file, maze_file,
+                                   checkpoint_interval)
+        model = SokobanModel(maze_file)
+        # Packed states of the moves still in effect, to undo onto.
+        history = [pack_state(model)]
+        snapshots = [history[-1]]
+        while len(snapshots) <= events:
+            out_of_moves = model.get_player_moves_remaining() <= 0
+            if out_of_moves and not undo_rate:
+                break
+            if len(history) > 1 and (out_of_moves or rng.random() < undo_rate):
+                history.pop()
+                model = SokobanModel(maze_file)
+                unpack_state(model, history[-1])
+                recorder.record_undo()
+            else:
+                direction = rng.choice(DIRECTIONS)
+                if not model.attempt_move(direction):
+                    continue
+                recorder.record_move(direction, model)
+                history.append(pack_state(model))
+            snapshots.append(history[-1])
+            recorder.flush()
+        recorder.close()
+        return snapshots
+
+    def assert_frames_match(self, snapshots: list[bytes]) -> None:
+        player = SessionPlayer(self.archive_file)
+        self.assertTrue(player.complete)
+        self.assertEqual(len(player), len(snapshots) - 1)
+        self.assertGreater(len(player), 3)
+        self.assertTrue(player.checkpoints)
+        for index, snapshot in enumerate(snapshots):
+            self.assertEqual(pack_state(player.frame(index)), snapshot,
+                             f'frame {index}')
+
+    def test_moves(self) -> None:
+        self.assert_frames_match(self.record(40, 0, seed=1))
+
+    def test_moves_and_undo(self) -> None:
+        snapshots = self.record(60, 0.3, seed=2)
+        self.assertIn('u', SessionPlayer(self.archive_file).get_moves())
+        self.assert_frames_match(snapshots)
+
+    def test_maze_file_override(self) -> None:
+        snapshots = self.record(10, 0, seed=3)
+        player = SessionPlayer(self.archive_file,
+                               os.path.relpath(MAZE_FILE))
+        self.assertEqual(pack_state(player.frame(len(player))), snapshots[-1])
+        self.assertTrue(os.path.isabs(SessionPlayer(self.archive_file).maze_file))
+
+    def test_flush_keeps_runs_compact(self) -> None:
+        # An empty room with moves to spare, so runs grow long
+        maze_file = os.path.join(os.path.dirname(self.archive_file), 'room.txt')
+        with open(maze_file, 'w') as file:
+            file.write('1 1000\nWWWWWW\nWP  GW\nW    W\nWWWWWW\n')
+        # Flushed after every event, with no checkpoints to end the runs
+        self.record(300, 0.02, seed=4, checkpoint_interval=1000,
+                    maze_file=maze_file)
+        flushed = SessionPlayer(self.archive_file)
+        with open(self.archive_file, 'rb') as file:
+            flushed_data = file.read()
+
+        recorder = SessionRecorder(self.archive_file, maze_file, 1000)
+        for event in flushed.get_moves():
+            if event == 'u':
+                recorder.record_undo()
+            else:
+                recorder.record_move(event, None)
+        recorder.close()
+        with open(self.archive_file, 'rb') as file:
+            self.assertEqual(file.read(), flushed_data)
+
+    def test_cut_off_archive(self) -> None:
+        snapshots = self.record(40, 0.3, seed=5)
+        with open(self.archive_file, 'rb') as file:
+            data = file.read()
+        whole = SessionPlayer(self.archive_file)
+        for cut in range(1, 40):
+            with open(self.archive_file, 'wb') as file:
+                file.write(data[:-cut])
+            player = SessionPlayer(self.archive_file)
+            self.assertFalse(player.complete)
+            self.assertEqual(player.events, whole.events[:len(player)])
+            self.assertEqual(pack_state(player.frame(len(player))),
+                             snapshots[len(player)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Checks for the hint API and resumable searches in solver.py.
+
+Run with `python -m unittest test_solver` or `python -m pytest`.
+"""
+import os
+import unittest
+
+import solver
+from a2 import SokobanModel
+
+MAZE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'maze_files')
+
+
+def maze(name: str) -> str:
+    """Returns the path of a maze file shipped with the game."""
+    return os.path.join(MAZE_DIRECTORY, name)
+
+
+class HintSessionTest(unittest.TestCase):
+    """
+    Checks that hints reuse their session's work between calls.
+    """
+
+    def test_session_survives_without_cache(self) -> None:
+        model = SokobanModel(maze('maze3.txt'))
+        first = solver.hint(model, 2000, cache=False)
+        self.assertTrue(first.is_optimal())
+        session = solver._sessions[model]
+
+        model.attempt_move(first.get_move())
+        second = solver.hint(model, 5, cache=False)
+        self.assertIs(solver._sessions[model], session)
+        self.assertIsNone(session.cache)
+        self.assertEqual(second.get_plan(), first.get_plan()[1:])
+        self.assertTrue(second.is_optimal())
+
+    def test_session_resumes_interrupted_searches(self) -> None:
+        model = SokobanModel(maze('maze3.txt'))
+        session = solver.HintSession(cache=False)
+        # No time at all: both searches stop before expanding anything
+        first = session.hint(model, 0)
+        self.assertIsNone(first.is_winnable())
+        greedy, bfs = session._greedy, session._bfs
+
+        session.hint(model, 0)
+        self.assertIs(session._greedy, greedy)
+        self.assertIs(session._bfs, bfs)
+
+        final = session.hint(model, 5000)
+        self.assertIs(session._bfs, bfs)
+        self.assertTrue(final.is_winnable())
+        self.assertTrue(final.is_optimal())
+
+    def test_unwinnable_position(self) -> None:
+        model = SokobanModel(maze('maze3.txt'))
+        model.player_moves = 3
+        result = solver.hint(model, 5000, cache=False)
+        self.assertIsNone(result.get_move())
+        self.assertIs(result.is_winnable(), False)
+        self.assertTrue(result.is_optimal())
+
+
+class RerootTest(unittest.TestCase):
+    """
+    Checks that a re-rooted search finds plans as short as a fresh one.
+    """
+
+    def test_reroot_matches_fresh_search(self) -> None:
+        rerooted = 0
+        for name in ('maze1.txt', 'maze2.txt', 'maze3.txt'):
+            level, root, moves = solver.encode_file(maze(name))
+            old = solver.BreadthFirstSearch(level, root, moves)
+            old.run(max_states=400)
+
+            # Every state within two moves of the root, with its moves left
+            nodes = [(root, moves)]
+            for state, remaining in list(nodes):
+                for _, child, bonus in solver.successors(level, state):
+                    nodes.append((child, remaining - 1 + bonus))
+            for state, remaining in nodes[1:]:
+                for _, child, bonus in solver.successors(level, state):
+                    nodes.append((child, remaining - 1 + bonus))
+
+            for state, remaining in nodes:
+                search = old.reroot(state, remaining)
+                if search is None:
+                    continue
+                rerooted += 1
+                search.run()
+                fresh = solver.search(level, state, remaining)
+                self.assertTrue(search.finished)
+                self.assertEqual(search.result is None, fresh.moves is None)
+                if fresh.moves is not None:
+                    self.assertEqual(len(search.result), len(fresh.moves))
+                    self.assert_wins(level, state, remaining, search.result)
+        self.assertGreater(rerooted, 10)
+
+    def assert_wins(
+        self,
+        level: solver.Level,
+        state: solver.State,
+        moves: int,
+        plan: list[str]
+    ) -> None:
+        for direction in plan:
+            self.assertGreater(moves, 0)
+            children = {move: (child, bonus) for move, child, bonus
+                        in solver.successors(level, state)}
+            state, bonus = children[direction]
+            moves += bonus - 1
+        self.assertTrue(level.is_won(state))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,305 @@
+"""
+Windowed display for mazes much larger than the terminal.
+
+ViewportView is a drop-in replacement for SokobanView that only renders the
+part of the maze around the player. Entities are found through a spatial
+index, and both the index and the optional minimap are built once and then
+patched around the player after each move, so the cost of a frame depends on
+the window size rather than the maze size.
+"""
+import shutil
+
+from a2_support import *
+
+DEFAULT_BUCKET_SIZE = 16
+MINIMAP_ROWS = 8
+MINIMAP_COLUMNS = 24
+# Lines used by the stats, the prompt and blank lines around the board.
+RESERVED_LINES = 5
+
+
+class SpatialIndex:
+    """
+    Buckets positions into square blocks so that the positions inside a
+    rectangle can be found without looking at every cell.
+    """
+
+    def __init__(self, bucket_size: int = DEFAULT_BUCKET_SIZE) -> None:
+        """
+        Initializes an empty index.
+
+        Parameters:
+        - bucket_size (int): Side length of each block, in cells.
+        """
+        self.bucket_size = bucket_size
+        self.buckets = {}
+
+    def _bucket(self, position: Position) -> tuple[int, int]:
+        """Returns the block a position belongs to."""
+        return (position[0] // self.bucket_size,
+                position[1] // self.bucket_size)
+
+    def add(self, position: Position) -> None:
+        """Adds a position to the index."""
+        self.buckets.setdefault(self._bucket(position), set()).add(position)
+
+    def discard(self, position: Position) -> None:
+        """Removes a position from the index if it is there."""
+        bucket = self.buckets.get(self._bucket(position))
+        if bucket is not None:
+            bucket.discard(position)
+
+    def query(
+        self,
+        top: int,
+        left: int,
+        bottom: int,
+        right: int
+    ) -> list[Position]:
+        """
+        Finds the indexed positions inside a rectangle.
+
+        Parameters:
+        - top, left (int): First row and column inside the rectangle.
+        - bottom, right (int): First row and column past the rectangle.
+
+        Returns:
+        list[Position]: The positions inside the rectangle.
+        """
+        size = self.bucket_size
+        found = []
+        for bucket_row in range(top // size, (bottom - 1) // size + 1):
+            for bucket_column in range(left // size, (right - 1) // size + 1):
+                for row, column in self.buckets.get((bucket_row, bucket_column), ()):
+                    if top <= row < bottom and left <= column < right:
+                        found.append((row, column))
+        return found
+
+
+class Minimap:
+    """
+    A scaled-down overview of the whole maze, where each character stands for
+    a block of cells. Built once, then updated one cell at a time.
+    """
+
+    def __init__(self, maze: Grid, entities: Entities) -> None:
+        """
+        Builds the minimap from the full maze.
+
+        Parameters:
+        - maze (Grid): The current maze.
+        - entities (Entities): A dictionary mapping positions to entities.
+        """
+        height = len(maze)
+        width = max((len(row) for row in maze), default=0)
+        self.scale = max(1, -(-height // MINIMAP_ROWS),
+                         -(-width // MINIMAP_COLUMNS))
+        self.rows = -(-height // self.scale)
+        self.columns = -(-width // self.scale)
+        self.open = set()
+        self.crates = {}
+        self.goals = {}
+        self.cells = {}
+
+        for row, tiles in enumerate(maze):
+            for column, tile in enumerate(tiles):
+                tile_type = tile.get_type()
+                if tile_type != WALL:
+                    self.open.add(self._block((row, column)))
+                if tile_type == GOAL:
+                    self.refresh(maze, entities, (row, column))
+        for position in entities:
+            self.refresh(maze, entities, position)
+
+    def _block(self, position: Position) -> tuple[int, int]:
+        """Returns the minimap character a position belongs to."""
+        return (position[0] // self.scale, position[1] // self.scale)
+
+    def refresh(self, maze: Grid, entities: Entities, position: Position) -> None:
+        """
+        Brings the counts for one cell up to date.
+
+        Parameters:
+        - maze (Grid): The current maze.
+        - entities (Entities): A dictionary mapping positions to entities.
+        - position (Position): The cell that may have changed.
+        """
+        row, column = position
+        entity = entities.get(position)
+        is_crate = entity is not None and entity.get_type() == CRATE
+        tile = maze[row][column]
+        is_open_goal = tile.get_type() == GOAL and not tile.is_filled()
+
+        old_crate, old_goal = self.cells.get(position, (False, False))
+        block = self._block(position)
+        self.crates[block] = self.crates.get(block, 0) + is_crate - old_crate
+        self.goals[block] = self.goals.get(block, 0) + is_open_goal - old_goal
+        if is_crate or is_open_goal:
+            self.cells[position] = (is_crate, is_open_goal)
+        else:
+            self.cells.pop(position, None)
+
+    def render(self, player_position: Position) -> list[str]:
+        """
+        Draws the minimap.
+
+        Parameters:
+        - player_position (Position): The current position of the player.
+
+        Returns:
+        list[str]: One string per minimap row.
+        """
+        player_block = self._block(player_position)
+        lines = []
+        for row in range(self.rows):
+            line = []
+            for column in range(self.columns):
+                block = (row, column)
+                if block == player_block:
+                    line.append(PLAYER)
+                elif self.crates.get(block):
+                    line.append(CRATE)
+                elif self.goals.get(block):
+                    line.append(GOAL)
+                elif block in self.open:
+                    line.append(FLOOR)
+                else:
+                    line.append(WALL)
+            lines.append(''.join(line))
+        return lines
+
+
+class ViewportView(SokobanView):
+    """
+    A text-based view that renders only a window around the player, sized
+    to the terminal unless a size is given.
+
+    The spatial index and minimap are rebuilt when a new entities dictionary
+    is shown or the player jumps more than one cell. Otherwise only the cells
+    a single move can change, those within two cells of the player's old or
+    new position, are refreshed.
+    """
+
+    def __init__(
+        self,
+        height: int | None = None,
+        width: int | None = None,
+        minimap: bool = False,
+        bucket_size: int = DEFAULT_BUCKET_SIZE
+    ) -> None:
+        """
+        Initializes the view.
+
+        Parameters:
+        - height (int | None): Rows of maze to show, or None to fit the terminal.
+        - width (int | None): Columns of maze to show, or None to fit the terminal.
+        - minimap (bool): Whether to show an overview of the whole maze.
+        - bucket_size (int): Block size of the spatial index.
+        """
+        self.height = height
+        self.width = width
+        self.show_minimap = minimap
+        self.bucket_size = bucket_size
+        self.index = None
+        self.minimap = None
+        self._entities = None
+        self._position = None
+        self._maze_width = 0
+
+    def _window_size(self) -> tuple[int, int]:
+        """
+        Returns the (height, width) of the window in cells.
+        """
+        columns, lines = shutil.get_terminal_size()
+        height = self.height
+        if height is None:
+            height = lines - RESERVED_LINES
+            if self.show_minimap:
+                height -= MINIMAP_ROWS + 1
+        width = self.width if self.width is not None else columns
+        return max(height, 1), max(width, 1)
+
+    def _rebuild(self, maze: Grid, entities: Entities) -> None:
+        """
+        Indexes every entity, measures the maze and builds the minimap from
+        scratch.
+        """
+        self._maze_width = max((len(row) for row in maze), default=0)
+        self.index = SpatialIndex(self.bucket_size)
+        for position in entities:
+            self.index.add(position)
+        if self.show_minimap:
+            self.minimap = Minimap(maze, entities)
+        self._entities = entities
+
+    def _refresh_around(
+        self,
+        maze: Grid,
+        entities: Entities,
+        position: Position
+    ) -> None:
+        """
+        Refreshes the index and minimap for the cells within two cells of
+        a position.
+        """
+        row, column = position
+        for row_delta in range(-2, 3):
+            for column_delta in range(-2 + abs(row_delta), 3 - abs(row_delta)):
+                cell = (row + row_delta, column + column_delta)
+                if not (0 <= cell[0] < len(maze)
+                        and 0 <= cell[1] < len(maze[cell[0]])):
+                    continue
+                if cell in entities:
+                    self.index.add(cell)
+                else:
+                    self.index.discard(cell)
+                if self.minimap is not None:
+                    self.minimap.refresh(maze, entities, cell)
+
+    def display_game(
+        self,
+        maze: Grid,
+        entities: Entities,
+        player_position: Position
+    ) -> None:
+        """
+        Display the part of the game around the player.
+
+        Parameters:
+            maze: The current maze.
+            entities: A dictionary mapping positions to entities
+            player_position: The current position of the player.
+        """
+        old = self._position
+        if (entities is not self._entities or old is None
+                or abs(old[0] - player_position[0])
+                + abs(old[1] - player_position[1]) > 1):
+            self._rebuild(maze, entities)
+        else:
+            self._refresh_around(maze, entities, old)
+            self._refresh_around(maze, entities, player_position)
+        self._position = player_position
+
+        height, width = self._window_size()
+        maze_height = len(maze)
+        maze_width = self._maze_width
+        top = min(max(player_position[0] - height // 2, 0),
+                  max(maze_height - height, 0))
+        left = min(max(player_position[1] - width // 2, 0),
+                   max(maze_width - width, 0))
+        bottom = min(top + height, maze_height)
+        right = min(left + width, maze_width)
+
+        lines = [[str(tile) for tile in maze[row][left:right]]
+                 for row in range(top, bottom)]
+        for row, column in self.index.query(top, left, bottom, right):
+            lines[row - top][column - left] = str(entities[(row, column)])
+        lines[player_position[0] - top][player_position[1] - left] = PLAYER
+
+        for line in lines:
+            print(''.join(line))
+        print()
+        if self.minimap is not None:
+            for line in self.minimap.render(player_position):
+                print(line)
+            print()